@@ -0,0 +1,320 @@
+# ==========================================================
+# alerts.py — Watchlist alerts on the views' indicators
+# ==========================================================
+#
+# Rules are plain text such as "RSI < 30" or "Close crosses_above
+# SMA_200", for one symbol or for every symbol in the universe ("*").
+# Rules are compiled per symbol into index/opcode arrays over one value
+# vector, so each new bar is evaluated for all of a symbol's rules in
+# one NumPy pass. Indicators are kept by indicators.IndicatorSet and
+# updated in O(1) per bar: a refresh only touches symbols whose last
+# bar changed, and never rescans history.
+#
+# Run standalone, it refreshes the histories every few minutes and,
+# with --live, also evaluates on streaming ticks:
+#
+#   python alerts.py RELIANCE.NS TCS.NS --rule "RSI < 30" --rule "Close crosses_above SMA_200"
+#   python alerts.py --fno --rule "RSI > 70" --interval 15m --period 5d --live --out alerts.jsonl
+
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+import datetime
+import numpy as np
+from indicators import IndicatorSet
+from functions import fetch_fno_list, fetch_history
+from dataclient import get_data_client
+from resilience import BULK
+from streaming import QuoteHub, YFinanceSource
+
+UNIVERSE = "*"
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+OPS = ["<", ">", "<=", ">=", "crosses_above", "crosses_below"]
+CROSS_OPS = {OPS.index("crosses_above"), OPS.index("crosses_below")}
+
+# indicator columns -> indicator that produces them
+PRODUCED_BY = {"Signal": "MACD", "MACD_Hist": "MACD"}
+
+
+class Rule:
+    """One condition: "<left> <op> <right>", right a number or a column."""
+
+    def __init__(self, text, symbols=UNIVERSE):
+        parts = text.split()
+        if len(parts) != 3 or parts[1] not in OPS:
+            raise ValueError(f"Invalid rule: {text!r} (expected '<left> <op> <right>')")
+        self.text = text
+        self.symbols = symbols
+        self.left, self.op = parts[0], OPS.index(parts[1])
+        try:
+            self.right = float(parts[2])
+        except ValueError:
+            self.right = parts[2]
+
+    def applies_to(self, symbol):
+        return self.symbols == UNIVERSE or symbol in self.symbols
+
+    def columns(self):
+        columns = [self.left]
+        if isinstance(self.right, str):
+            columns.append(self.right)
+        return columns
+
+    def indicators(self):
+        return {PRODUCED_BY.get(c, c) for c in self.columns() if c not in PRICE_COLUMNS}
+
+    def __repr__(self):
+        return f"Rule({self.text!r}, symbols={self.symbols!r})"
+
+
+# ==========================================================
+# SINKS
+# ==========================================================
+class FileSink:
+    """Appends alerts as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, alert):
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(alert, default=str) + "\n")
+
+
+class StreamSink:
+    """Writes alerts as JSON lines to a text stream (stdout by default)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def send(self, alert):
+        with self.lock:
+            self.stream.write(json.dumps(alert, default=str) + "\n")
+            self.stream.flush()
+
+
+class QueueSink:
+    """Puts alerts on a queue.Queue (or anything with put)."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def send(self, alert):
+        self.queue.put(alert)
+
+
+# ==========================================================
+# PER-SYMBOL PROGRAM
+# ==========================================================
+class _Program:
+    """Compiled rules and indicator state of one symbol."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        indicators = sorted(set().union(*(r.indicators() for r in rules)))
+        self.state = IndicatorSet(indicators)
+        self.columns = PRICE_COLUMNS + [c for c in self.state.columns() if c not in PRICE_COLUMNS]
+        index = {c: k for k, c in enumerate(self.columns)}
+        self.left = np.array([index[r.left] for r in rules])
+        self.right = np.array([index[r.right] if isinstance(r.right, str) else -1 for r in rules])
+        self.const = np.array([r.right if not isinstance(r.right, str) else np.nan for r in rules])
+        self.op = np.array([r.op for r in rules])
+        self.cross = np.isin(self.op, list(CROSS_OPS))
+        self.active = np.zeros(len(rules), dtype=bool)
+        self.prev = np.full(len(self.columns), np.nan)
+        self.current = np.full(len(self.columns), np.nan)
+
+    def push(self, time, bar):
+        """Feed one bar; returns False if nothing changed."""
+        new_bar = time != self.state.last_time
+        row = self.state.push(time, {c: bar[c] for c in IndicatorSet.OHLC})
+        if row is None:
+            return False
+        values = dict(bar, **row)
+        if new_bar:
+            self.prev = self.current
+            self.active[self.cross] = False
+        self.current = np.array([values.get(c, np.nan) for c in self.columns], dtype=float)
+        return True
+
+    def evaluate(self):
+        """Indices of rules that fire on the current bar."""
+        v, p = self.current, self.prev
+        lhs, plhs = v[self.left], p[self.left]
+        rhs = np.where(self.right < 0, self.const, v[np.maximum(self.right, 0)])
+        prhs = np.where(self.right < 0, self.const, p[np.maximum(self.right, 0)])
+        with np.errstate(invalid="ignore"):
+            cond = np.select(
+                [self.op == k for k in range(len(OPS))],
+                [lhs < rhs, lhs > rhs, lhs <= rhs, lhs >= rhs,
+                 (plhs <= prhs) & (lhs > rhs), (plhs >= prhs) & (lhs < rhs)],
+            )
+        cond = cond.astype(bool)
+        fire = cond & ~self.active
+        self.active = cond
+        return np.flatnonzero(fire), lhs, rhs
+
+
+# ==========================================================
+# ENGINE
+# ==========================================================
+class AlertEngine:
+    """Evaluates rules for the symbols whose data changed."""
+
+    def __init__(self, rules, sink):
+        self.rules = list(rules)
+        self.sink = sink
+        self.programs = {}
+        self.hub = None
+        self.listening = set()
+        self.lock = threading.Lock()
+
+    def add_rule(self, rule):
+        with self.lock:
+            self.rules.append(rule)
+            self.programs.clear()  # recompiled (and reseeded) on next data
+
+    def _program(self, symbol):
+        program = self.programs.get(symbol)
+        if program is None:
+            rules = [r for r in self.rules if r.applies_to(symbol)]
+            if not rules:
+                return None
+            program = self.programs[symbol] = _Program(rules)
+            self._listen(symbol)
+        return program
+
+    def _listen(self, symbol):
+        if self.hub is not None and symbol not in self.listening:
+            self.hub.listen(symbol, self.on_tick)
+            self.listening.add(symbol)
+
+    def _dispatch(self, symbol, program, time):
+        fired, lhs, rhs = program.evaluate()
+        for k in fired:
+            rule = program.rules[k]
+            self.sink.send({
+                "symbol": symbol,
+                "rule": rule.text,
+                "time": time,
+                "left": float(lhs[k]),
+                "right": float(rhs[k]),
+                "sent_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            })
+        return len(fired)
+
+    def update(self, symbol, df):
+        """Feed a symbol's history; only bars after the last one seen are processed.
+
+        On first sight the history only seeds the indicators; alerts are
+        evaluated from the latest bar on. Returns the number of alerts sent.
+        """
+        with self.lock:
+            program = self._program(symbol)
+            if program is None or df.empty:
+                return 0
+            last_time = program.state.last_time
+            if last_time is not None and last_time not in df.index:
+                program = self.programs[symbol] = _Program(program.rules)
+                last_time = None
+            seeding = last_time is None
+            start = 0 if seeding else df.index.get_loc(last_time)
+            bars = df.iloc[start:]
+            columns = [c for c in PRICE_COLUMNS if c in bars]
+            sent = 0
+            for time, bar in zip(bars.index, bars[columns].to_dict("records")):
+                bar.setdefault("Volume", math.nan)
+                if program.push(time, bar) and not seeding:
+                    sent += self._dispatch(symbol, program, time)
+            if seeding:
+                sent += self._dispatch(symbol, program, program.state.last_time)
+            return sent
+
+    def refresh(self, histories):
+        """Update every symbol in {symbol: history}; unchanged ones cost one comparison."""
+        return sum(self.update(symbol, df) for symbol, df in histories.items())
+
+    def on_tick(self, tick):
+        """Streaming tick: revise the forming bar's close and evaluate."""
+        symbol, price = tick.get("id"), tick.get("price")
+        with self.lock:
+            program = self.programs.get(symbol)
+            if program is None or program.state.last_bar is None or price is None:
+                return 0
+            bar = dict(program.state.last_bar)
+            bar["Close"] = price
+            bar["High"] = max(bar["High"], price)
+            bar["Low"] = min(bar["Low"], price)
+            bar["Volume"] = program.current[PRICE_COLUMNS.index("Volume")]  # ticks carry no bar volume
+            if not program.push(program.state.last_time, bar):
+                return 0
+            return self._dispatch(symbol, program, program.state.last_time)
+
+    def attach(self, hub):
+        """Receive ticks from a streaming.QuoteHub for every compiled symbol,
+        including symbols compiled after this call."""
+        with self.lock:
+            self.hub = hub
+            for symbol in list(self.programs):
+                self._listen(symbol)
+
+
+# ==========================================================
+# RUNNER
+# ==========================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watchlist alerts over refreshed histories and live ticks")
+    parser.add_argument("symbols", nargs="*")
+    parser.add_argument("--file", help="file with one symbol per line")
+    parser.add_argument("--fno", action="store_true", help="the whole NSE F&O list")
+    parser.add_argument("--rule", action="append", default=[], help='e.g. "RSI < 30" (repeatable)')
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--every", type=float, default=300, help="seconds between history refreshes")
+    parser.add_argument("--live", action="store_true", help="also evaluate on streaming ticks")
+    parser.add_argument("--out", help="append alerts to this JSON-lines file (default: stdout)")
+    parser.add_argument("--once", action="store_true", help="one refresh, then exit")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if args.fno:
+        symbols += fetch_fno_list()
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        parser.error("no symbols given")
+    if not args.rule:
+        parser.error("no rules given")
+    try:
+        rules = [Rule(text) for text in args.rule]
+        _Program(rules)  # unknown columns or indicators fail here, not on first data
+    except (ValueError, KeyError) as e:
+        parser.error(f"invalid rule: {e}")
+
+    engine = AlertEngine(rules, FileSink(args.out) if args.out else StreamSink())
+    if args.live:
+        engine.attach(QuoteHub(YFinanceSource()))
+    client = get_data_client()
+    while True:
+        for symbol in symbols:
+            fetch_history.clear(symbol, period=args.period, interval=args.interval)
+        histories = client.map(fetch_history, symbols, priority=BULK, period=args.period, interval=args.interval)
+        fresh = {s: h for s, h in zip(symbols, histories) if not isinstance(h, Exception)}
+        sent = engine.refresh(fresh)
+        print(f"{datetime.datetime.now():%H:%M:%S} {len(fresh)} of {len(symbols)} symbols, {sent} alerts",
+              file=sys.stderr)
+        if args.once:
+            return 0
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
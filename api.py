@@ -0,0 +1,274 @@
+# ==========================================================
+# api.py — Headless JSON/Arrow API over the dashboard's data
+# ==========================================================
+#
+# Serves the same fetch_* functions and indicator code as the views,
+# without Streamlit's UI:
+#
+#   python api.py --port 8600
+#
+# Set YFD_SHARED_CACHE to the value the dashboard uses and the two
+# share downloads (see shared_cache.py).
+#
+# GET  /health
+# GET  /metrics   process cache tiers and the upstream scheduler's budget
+# GET  /info?symbols=RELIANCE.NS,TCS.NS
+# GET  /quote?symbols=...
+# GET  /history?symbols=...&period=1mo&interval=1d&indicators=SMA_20,RSI&format=json|arrow
+# POST /batch   [{"endpoint": "history", "symbols": [...], ...}, ...]  (JSON)
+#
+# JSON responses are {"data": {symbol: ...}, "errors": {symbol: message}}.
+# Arrow responses are one IPC stream with a Symbol column; errors are in
+# the schema metadata under "errors". Bad requests answer 400 and
+# unexpected failures 500, both as {"error": message}.
+
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pyarrow as pa
+import streamlit as st
+from resilience import FetchError, InvalidSymbol, get_scheduler
+from functions import fetch_info, fetch_history
+from indicators import indicators_for, make_indicator
+from shared_cache import frame_to_table, tier_metrics
+
+MAX_SYMBOLS = 200
+MAX_WORKERS = 16
+RESPONSE_TTL = 60
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _symbols(params):
+    symbols = params.get("symbols") or []
+    if isinstance(symbols, str):
+        symbols = symbols.split(",")
+    symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+    if not symbols:
+        raise BadRequest("symbols is required")
+    if len(symbols) > MAX_SYMBOLS:
+        raise BadRequest(f"At most {MAX_SYMBOLS} symbols per request")
+    return symbols
+
+
+def _indicators(params):
+    indicators = params.get("indicators") or []
+    if isinstance(indicators, str):
+        indicators = indicators.split(",")
+    indicators = [i.strip() for i in indicators if i.strip()]
+    for indicator in indicators:
+        try:
+            make_indicator(indicator)
+        except ValueError as e:
+            raise BadRequest(str(e)) from e
+    return indicators
+
+
+def _map(func, symbols):
+    """{symbol: result} and {symbol: message} from a fetch over all symbols."""
+    data, errors = {}, {}
+    for symbol, result in zip(symbols, _pool.map(func, symbols)):
+        if isinstance(result, Exception):
+            errors[symbol] = str(result)
+        else:
+            data[symbol] = result
+    return data, errors
+
+
+# ==========================================================
+# ENDPOINTS
+# ==========================================================
+def get_info(params):
+    return _map(fetch_info, _symbols(params))
+
+
+def get_quote(params):
+    def quote(symbol):
+        hist = fetch_history(symbol, period="5d", interval="1d")
+        if isinstance(hist, Exception):
+            return hist
+        close = hist["Close"].dropna()
+        if close.empty:
+            return InvalidSymbol(f"No recent close for {symbol}")
+        last = float(close.iloc[-1])
+        prev = float(close.iloc[-2]) if len(close) > 1 else None
+        return {
+            "time": close.index[-1].isoformat(),
+            "price": last,
+            "change": None if prev is None else last - prev,
+            "change_percent": None if prev is None else (last / prev - 1) * 100,
+        }
+    return _map(quote, _symbols(params))
+
+
+def _history(symbol, period, interval, indicators):
+    hist = fetch_history(symbol, period=period, interval=interval)
+    if isinstance(hist, Exception):
+        raise hist  # not cached by the encoders below
+    if indicators:
+        hist = indicators_for((symbol, period, interval), hist.copy(deep=False), list(indicators))
+    return hist
+
+
+# Encoded histories are reused for RESPONSE_TTL seconds, so a hot
+# symbol is serialized once rather than on every request.
+@st.cache_resource(ttl=RESPONSE_TTL, max_entries=1024)
+def _history_json(symbol, period, interval, indicators):
+    return _history(symbol, period, interval, indicators).to_json(orient="split", date_format="iso")
+
+
+@st.cache_resource(ttl=RESPONSE_TTL, max_entries=1024)
+def _history_table(symbol, period, interval, indicators):
+    table = frame_to_table(_history(symbol, period, interval, indicators))
+    return table.add_column(0, "Symbol", pa.array([symbol] * len(table), pa.string()))
+
+
+def get_history(params):
+    """{symbol: JSON text or Arrow table} depending on params["format"]."""
+    period = params.get("period", "1mo")
+    interval = params.get("interval", "1d")
+    indicators = tuple(_indicators(params))
+    encode = _history_table if params.get("format") == "arrow" else _history_json
+
+    def history(symbol):
+        try:
+            return encode(symbol, period, interval, indicators)
+        except FetchError as e:
+            return e
+    return _map(history, _symbols(params))
+
+
+ENDPOINTS = {"info": get_info, "quote": get_quote, "history": get_history}
+
+
+# ==========================================================
+# ENCODING
+# ==========================================================
+def to_json(endpoint, data, errors):
+    if endpoint != "history":
+        return json.dumps({"data": data, "errors": errors}, default=str)
+    # histories are already JSON text from pandas' C writer
+    frames = ",".join(json.dumps(symbol) + ":" + text for symbol, text in data.items())
+    return '{"data":{' + frames + '},"errors":' + json.dumps(errors) + "}"
+
+
+def to_arrow(data, errors):
+    if data:
+        table = pa.concat_tables(list(data.values()), promote_options="default")
+    else:
+        table = pa.table({"Symbol": pa.array([], pa.string())})
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"errors": json.dumps(errors).encode()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+# ==========================================================
+# HTTP
+# ==========================================================
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    quiet = True
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({"error": message}))
+
+    def _dispatch(self, handler):
+        """Run handler; any unexpected error becomes a JSON 500."""
+        try:
+            handler()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away; nothing to answer
+        except Exception as e:
+            self.log_error("%s %s failed: %r", self.command, self.path, e)
+            self._error(500, f"Internal error: {type(e).__name__}")
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def _get(self):
+        url = urlparse(self.path)
+        endpoint = url.path.strip("/")
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if endpoint == "health":
+            return self._send(200, '{"status":"ok"}')
+        if endpoint == "metrics":
+            return self._send(200, json.dumps({"cache": tier_metrics(), "upstream": get_scheduler().metrics()}))
+        if endpoint not in ENDPOINTS:
+            return self._error(404, f"Unknown endpoint: {endpoint}")
+        fmt = params.get("format", "json")
+        if fmt == "arrow" and endpoint != "history":
+            return self._error(400, "format=arrow is only available for history")
+        try:
+            data, errors = ENDPOINTS[endpoint](params)
+        except BadRequest as e:
+            return self._error(400, str(e))
+        if fmt == "arrow":
+            return self._send(200, to_arrow(data, errors).to_pybytes(), ARROW_STREAM)
+        self._send(200, to_json(endpoint, data, errors))
+
+    def _post(self):
+        if urlparse(self.path).path.strip("/") != "batch":
+            return self._error(404, "Unknown endpoint")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            queries = json.loads(self.rfile.read(length) or b"[]")
+            if not isinstance(queries, list):
+                raise BadRequest("Body must be a JSON list of queries")
+            results = []
+            for query in queries:
+                endpoint = query.get("endpoint")
+                if endpoint not in ENDPOINTS:
+                    raise BadRequest(f"Unknown endpoint: {endpoint}")
+                data, errors = ENDPOINTS[endpoint](dict(query, format="json"))
+                results.append(to_json(endpoint, data, errors))
+        except (BadRequest, ValueError, AttributeError) as e:
+            return self._error(400, str(e))
+        self._send(200, "[" + ",".join(results) + "]")
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host="127.0.0.1", port=8600, quiet=True):
+    Handler.quiet = quiet
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"Serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless API over the dashboard's data layer")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    serve(args.host, args.port, quiet=not args.verbose)
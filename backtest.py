@@ -0,0 +1,196 @@
+# ==========================================================
+# backtest.py — Vectorized SMA crossover parameter sweeps
+# ==========================================================
+#
+# All SMAs come from one cumulative sum; positions and returns for a
+# chunk of (fast, slow) pairs are a (time x pair) array, so a sweep is a
+# handful of array operations per chunk. Symbols can be spread over a
+# process pool:
+#
+#   python backtest.py RELIANCE.NS TCS.NS --fast 5,10,20 --slow 50,100,200
+#   python backtest.py --fno --processes 8 --out sweep.csv
+
+import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from functions import fetch_fno_list, fetch_history
+from correlation import PERIODS_PER_YEAR
+from dataclient import get_data_client
+from resilience import BULK
+
+CHUNK = 512  # parameter pairs evaluated per array pass
+
+STATS = ["Total Return", "CAGR", "Volatility", "Sharpe", "Max Drawdown", "Trades", "Exposure"]
+
+
+def sma_matrix(close, windows):
+    """(T, W) array of simple moving averages, NaN before each window fills."""
+    c = np.concatenate([[0.0], np.cumsum(close)])
+    windows = np.asarray(windows)
+    t = np.arange(1, len(close) + 1)[:, None]
+    start = t - windows[None, :]
+    out = (c[t] - c[np.clip(start, 0, None)]) / windows[None, :]
+    out[start < 0] = np.nan
+    return out
+
+
+def parameter_pairs(fast_windows, slow_windows):
+    """All (fast, slow) combinations with fast < slow."""
+    fast, slow = np.meshgrid(fast_windows, slow_windows, indexing="ij")
+    keep = fast < slow
+    return np.column_stack([fast[keep], slow[keep]])
+
+
+def _stats(strategy, positions, periods_per_year):
+    """Statistics per column of a (T, P) strategy return array."""
+    equity = np.cumprod(1 + strategy, axis=0)
+    total = equity[-1] - 1
+    years = len(strategy) / periods_per_year
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cagr = np.where(equity[-1] > 0, equity[-1] ** (1 / years) - 1, -1.0)
+        vol = strategy.std(axis=0, ddof=1) * np.sqrt(periods_per_year)
+        sharpe = strategy.mean(axis=0) * periods_per_year / vol
+    drawdown = (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0)
+    trades = np.abs(np.diff(positions, axis=0)).sum(axis=0)
+    exposure = np.abs(positions).mean(axis=0)
+    return np.column_stack([total, cagr, vol, sharpe, drawdown, trades, exposure])
+
+
+def sweep_sma_crossover(close, fast_windows, slow_windows, cost=0.0, long_short=False, interval="1d"):
+    """Evaluate every fast/slow SMA crossover on one close series.
+
+    Long (or long/short) while SMA_fast > SMA_slow, entering on the next
+    bar; cost is charged per unit of position change. Returns a stats
+    DataFrame indexed by (fast, slow).
+    """
+    close = np.asarray(close, dtype=float)
+    pairs = parameter_pairs(fast_windows, slow_windows)
+    if len(pairs) == 0:
+        index = pd.MultiIndex.from_arrays([[], []], names=["Fast", "Slow"])
+        return pd.DataFrame(columns=STATS, index=index)
+    windows = np.unique(pairs)
+    smas = sma_matrix(close, windows)
+    column = {w: k for k, w in enumerate(windows)}
+    returns = np.diff(close) / close[:-1]
+    periods_per_year = PERIODS_PER_YEAR.get(interval, 252)
+
+    results = []
+    for start in range(0, len(pairs), CHUNK):
+        chunk = pairs[start:start + CHUNK]
+        fast = smas[:, [column[w] for w in chunk[:, 0]]]
+        slow = smas[:, [column[w] for w in chunk[:, 1]]]
+        signal = np.where(fast > slow, 1.0, -1.0 if long_short else 0.0)
+        signal[np.isnan(slow)] = 0.0
+        positions = signal[:-1]  # decided at bar t, held over t -> t+1
+        turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))
+        strategy = positions * returns[:, None] - cost * turnover
+        results.append(_stats(strategy, positions, periods_per_year))
+
+    index = pd.MultiIndex.from_arrays([pairs[:, 0], pairs[:, 1]], names=["Fast", "Slow"])
+    return pd.DataFrame(np.vstack(results), index=index, columns=STATS)
+
+
+def equity_curve(close, fast, slow, cost=0.0, long_short=False, index=None):
+    """Equity of one parameter pair next to buy & hold."""
+    close = np.asarray(close, dtype=float)
+    smas = sma_matrix(close, [fast, slow])
+    signal = np.where(smas[:, 0] > smas[:, 1], 1.0, -1.0 if long_short else 0.0)
+    signal[np.isnan(smas[:, 1])] = 0.0
+    positions = signal[:-1]
+    returns = np.diff(close) / close[:-1]
+    turnover = np.abs(np.diff(positions, prepend=0.0))
+    strategy = positions * returns - cost * turnover
+    curve = pd.DataFrame({
+        f"SMA {fast}/{slow}": np.concatenate([[1.0], np.cumprod(1 + strategy)]),
+        "Buy & Hold": close / close[0],
+    })
+    if index is not None:
+        curve.index = index
+    return curve
+
+
+def _sweep_job(args):
+    symbol, close, fast_windows, slow_windows, cost, long_short, interval = args
+    stats = sweep_sma_crossover(close, fast_windows, slow_windows, cost, long_short, interval)
+    stats.insert(0, "Symbol", symbol)
+    return stats
+
+
+def run_sweep(symbols, fast_windows, slow_windows, period="10y", interval="1d",
+              cost=0.0, long_short=False, processes=None):
+    """Sweep many symbols; processes > 1 spreads them over a process pool.
+
+    Histories come from the cached fetch_history in this process; only
+    the close arrays are sent to the workers, which are spawned rather
+    than forked (the cache's sweeper thread does not survive a fork).
+    Returns (stats, errors).
+    """
+    jobs, errors = [], {}
+    hists = get_data_client().map(fetch_history, symbols, priority=BULK, period=period, interval=interval)
+    for symbol, hist in zip(symbols, hists):
+        if isinstance(hist, Exception):
+            errors[symbol] = hist
+            continue
+        close = hist["Close"].dropna().to_numpy(dtype=float)
+        jobs.append((symbol, close, list(fast_windows), list(slow_windows), cost, long_short, interval))
+
+    if processes and processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_sweep_job, jobs))
+    else:
+        results = [_sweep_job(job) for job in jobs]
+
+    if not results:
+        return pd.DataFrame(columns=["Symbol"] + STATS), errors
+    return pd.concat(results).reset_index().set_index(["Symbol", "Fast", "Slow"]), errors
+
+
+def _windows(text):
+    return [int(w) for w in text.split(",") if w.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SMA crossover parameter sweep over many symbols")
+    parser.add_argument("symbols", nargs="*")
+    parser.add_argument("--file", help="file with one symbol per line")
+    parser.add_argument("--fno", action="store_true", help="the whole NSE F&O list")
+    parser.add_argument("--fast", type=_windows, default="5,10,20,50", help="comma-separated fast windows")
+    parser.add_argument("--slow", type=_windows, default="50,100,150,200", help="comma-separated slow windows")
+    parser.add_argument("--period", default="10y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--cost", type=float, default=0.0, help="cost per unit of position change")
+    parser.add_argument("--long-short", action="store_true")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: none)")
+    parser.add_argument("--out", help="write every row to this CSV (default: print the best pair per symbol)")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if args.fno:
+        symbols += fetch_fno_list()
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        parser.error("no symbols given")
+
+    stats, errors = run_sweep(
+        symbols, args.fast, args.slow, period=args.period, interval=args.interval,
+        cost=args.cost, long_short=args.long_short, processes=args.processes,
+    )
+    for symbol, error in errors.items():
+        print(f"{symbol}: {error}", file=sys.stderr)
+    if args.out:
+        stats.to_csv(args.out)
+        print(f"{len(stats)} rows written to {args.out}")
+    elif not stats.empty:
+        best = stats.reset_index().sort_values("Sharpe", ascending=False).groupby("Symbol", sort=False).head(1)
+        print(best.set_index("Symbol").to_string(float_format="{:.3f}".format))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# ==========================================================
+# benchmarks/api_throughput.py — Throughput of the headless API
+# ==========================================================
+#
+# Start the API first (python api.py), then:
+#
+#   python benchmarks/api_throughput.py --symbols RELIANCE.NS,TCS.NS,INFY.NS \
+#       --concurrency 16 --requests 2000 --format arrow
+#
+# One warm-up request fills the caches; the timed run then measures the
+# cached path: requests per second and latency percentiles.
+
+import time
+import argparse
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run(url, total, concurrency):
+    def one(_):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            size = len(response.read())
+        return time.perf_counter() - start, size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(r[0] for r in results)
+    return elapsed, latencies, results[0][1]
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the headless API")
+    parser.add_argument("--base", default="http://127.0.0.1:8600")
+    parser.add_argument("--endpoint", default="history", choices=["history", "quote", "info"])
+    parser.add_argument("--symbols", default="RELIANCE.NS,TCS.NS,INFY.NS,HDFCBANK.NS,ICICIBANK.NS")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--indicators", default="SMA_20,RSI,MACD")
+    parser.add_argument("--format", default="json", choices=["json", "arrow"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    url = f"{args.base}/{args.endpoint}?symbols={args.symbols}"
+    if args.endpoint == "history":
+        url += f"&period={args.period}&interval={args.interval}&indicators={args.indicators}&format={args.format}"
+
+    cold, _, size = run(url, 1, 1)
+    elapsed, latencies, size = run(url, args.requests, args.concurrency)
+
+    print(f"URL:          {url}")
+    print(f"Cold request: {cold * 1000:.1f} ms")
+    print(f"Response:     {size / 1024:.1f} KiB")
+    print(f"Throughput:   {args.requests / elapsed:.1f} req/s ({args.concurrency} concurrent)")
+    print(f"Latency:      mean {statistics.mean(latencies) * 1000:.1f} ms, "
+          f"p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
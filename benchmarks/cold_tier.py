@@ -0,0 +1,78 @@
+# ==========================================================
+# benchmarks/cold_tier.py — Cold tier compression and promote latency
+# ==========================================================
+#
+# Fills a process cache with histories shaped like the dashboard's
+# largest entries, demotes them all and reads them back, per codec:
+#
+#   python benchmarks/cold_tier.py
+#   python benchmarks/cold_tier.py --symbols RELIANCE.NS TCS.NS --period max --interval 1d
+#
+# Without --symbols, synthetic histories are used (runs offline):
+# max-period daily bars and 5 days of 1m bars, prices on a 0.05 tick.
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from functions import fetch_history
+from shared_cache import process_cache
+
+SHAPES = {"max/1d": (7500, "B"), "5d/1m": (1875, "min")}
+
+
+def synthetic_history(shape, seed):
+    rows, freq = SHAPES[shape]
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2000-01-03 09:15", periods=rows, freq=freq, tz="Asia/Kolkata", name="Date")
+    close = np.round(np.maximum(1000 * np.exp(np.cumsum(rng.normal(0, 0.01, rows))), 1) / 0.05) * 0.05
+    spread = np.round(rng.uniform(0, 0.01, rows) * close / 0.05) * 0.05
+    return pd.DataFrame({
+        "Open": close + spread / 2, "High": close + spread, "Low": close - spread, "Close": close,
+        "Volume": rng.integers(1_000, 5_000_000, rows), "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compression ratio and promote latency of the cold tier")
+    parser.add_argument("--entries", type=int, default=50, help="synthetic histories per shape")
+    parser.add_argument("--symbols", nargs="*", help="use fetch_history for these symbols instead")
+    parser.add_argument("--period", default="max")
+    parser.add_argument("--interval", default="1d")
+    args = parser.parse_args()
+
+    if args.symbols:
+        calls = [(s, args.period, args.interval) for s in args.symbols]
+        loader = fetch_history
+    else:
+        calls = [(shape, seed) for shape in SHAPES for seed in range(args.entries)]
+        loader = synthetic_history
+
+    for codec in ["zstd", "lz4"]:
+        if not pa.Codec.is_available(codec):
+            print(f"{codec}: not available in this pyarrow build")
+            continue
+        cached = process_cache(ttl=3600, cold_after=0)(loader)
+        cached.cache.codec = codec
+        for call in calls:
+            cached(*call)
+        start = time.perf_counter()
+        cached.cache.sweep()
+        demote = time.perf_counter() - start
+        metrics = cached.cache.metrics()
+        for call in calls:
+            cached(*call)
+        after = cached.cache.metrics()
+
+        print(f"{codec}:")
+        print(f"  entries:            {metrics['cold_entries']} cold of {len(calls)}")
+        print(f"  raw / compressed:   {metrics['cold_raw_bytes'] / 2**20:.1f} MiB / {metrics['cold_bytes'] / 2**20:.1f} MiB")
+        print(f"  compression ratio:  {metrics['compression_ratio']:.2f}x")
+        print(f"  demote (all):       {demote * 1000:.0f} ms")
+        print(f"  promote p50/p95/max: {after['promote_ms_p50']:.2f} / {after['promote_ms_p95']:.2f} / {after['promote_ms_max']:.2f} ms")
@@ -0,0 +1,103 @@
+# ==========================================================
+# benchmarks/session_memory.py — Memory per additional session
+# ==========================================================
+#
+# Simulates N sessions rendering the same symbol the way the Stock
+# Market page does (cached history -> per-session frame -> ΔVolume% and
+# indicator columns) and keeps every session's frame alive, as open
+# sessions do. Reports heap growth per session.
+#
+#   python benchmarks/session_memory.py --sessions 200                 # shared frames
+#   python benchmarks/session_memory.py --sessions 200 --mode copy     # old behaviour
+#   python benchmarks/session_memory.py --symbol RELIANCE.NS --period 5d --interval 1m
+#
+# Without --symbol a synthetic 1m history of --rows bars is used, so
+# the benchmark runs offline.
+
+import os
+import sys
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from functions import fetch_history
+from indicators import indicators_for
+from shared_cache import process_cache
+
+INDICATORS = ["SMA_20", "SMA_50", "EMA_20", "RSI", "MACD"]
+
+
+def synthetic_history(rows):
+    index = pd.date_range("2024-01-01 09:15", periods=rows, freq="min", tz="Asia/Kolkata", name="Datetime")
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.1, rows))
+    return pd.DataFrame({
+        "Open": close, "High": close + 0.1, "Low": close - 0.1, "Close": close,
+        "Volume": np.full(rows, 1000.0), "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+
+shared_synthetic = process_cache(ttl=3600)(synthetic_history)
+copied_synthetic = st.cache_data(ttl=3600)(synthetic_history)
+
+
+def render_session(load, mode, key):
+    """What one session keeps: its frame with derived columns."""
+    hist = load()
+    df = hist.copy(deep=False) if mode == "shared" else hist.copy()
+    df["ΔVolume%"] = df["Volume"].pct_change() * 100
+    return indicators_for(key, df, INDICATORS)
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory growth per session on one popular symbol")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--mode", choices=["shared", "copy"], default="shared")
+    parser.add_argument("--rows", type=int, default=50_000, help="bars of the synthetic history")
+    parser.add_argument("--symbol", help="use fetch_history for this symbol instead")
+    parser.add_argument("--period", default="5d")
+    parser.add_argument("--interval", default="1m")
+    args = parser.parse_args()
+
+    if args.symbol:
+        def load():
+            return fetch_history(args.symbol, period=args.period, interval=args.interval)
+        key = (args.symbol, args.period, args.interval)
+    else:
+        cached = shared_synthetic if args.mode == "shared" else copied_synthetic
+
+        def load():
+            return cached(args.rows)
+        key = ("synthetic", args.rows)
+
+    # first session fills the caches and the indicator state
+    sessions = [render_session(load, args.mode, key)]
+    hist_mb = load().memory_usage(deep=True).sum() / 2**20
+    tracemalloc.start()
+    base_heap, base_rss = tracemalloc.get_traced_memory()[0], rss_mb()
+    for _ in range(args.sessions - 1):
+        sessions.append(render_session(load, args.mode, key))
+    heap = tracemalloc.get_traced_memory()[0] - base_heap
+    rss = rss_mb() - base_rss
+    tracemalloc.stop()
+
+    per_session = heap / max(args.sessions - 1, 1) / 1024
+    print(f"Mode:            {args.mode}")
+    print(f"History:         {len(sessions[0])} bars, {hist_mb:.1f} MiB")
+    print(f"Sessions:        {args.sessions}")
+    print(f"Heap growth:     {heap / 2**20:.1f} MiB ({per_session:.0f} KiB per additional session)")
+    print(f"RSS growth:      {rss:.1f} MiB")
@@ -0,0 +1,85 @@
+# ==========================================================
+# benchmarks/upstream_priority.py — Page latency during a bulk refresh
+# ==========================================================
+#
+# A bulk refresh of --universe symbols runs through the data client
+# while page renders ask for a symbol every --every seconds: every other
+# one is a symbol the refresh has queued but not fetched yet. All
+# calls go through the same decorator stack as fetch_history
+# (returns_errors / process_cache / circuit) against a fake upstream
+# that answers in --latency seconds under a --rate budget, so it runs
+# offline.
+#
+#   python benchmarks/upstream_priority.py            # priority classes
+#   python benchmarks/upstream_priority.py --flat     # everything one class
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import resilience
+from resilience import BULK, INTERACTIVE, UpstreamScheduler, circuit, returns_errors
+from shared_cache import process_cache
+from dataclient import get_data_client
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive latency while a bulk refresh runs")
+    parser.add_argument("--universe", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="upstream calls per second")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per upstream call")
+    parser.add_argument("--every", type=float, default=0.25, help="seconds between page requests")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--flat", action="store_true", help="no priority classes (plain FIFO budget)")
+    args = parser.parse_args()
+
+    resilience._scheduler = UpstreamScheduler(rate=args.rate, burst=args.rate)
+    if args.flat:
+        resilience.RESERVE.update({level: 0 for level in resilience.RESERVE})
+        resilience.MAX_WAIT.update({level: None for level in resilience.MAX_WAIT})
+
+    @returns_errors()
+    @process_cache(ttl=3600)
+    @circuit("benchmark")
+    def fake_history(symbol):
+        time.sleep(args.latency)
+        return [symbol]
+
+    client = get_data_client()
+    bulk_level = INTERACTIVE if args.flat else BULK
+    bulk_done = []
+
+    def refresh():
+        start = time.perf_counter()
+        client.map(fake_history, [f"BULK{i}" for i in range(args.universe)], priority=bulk_level)
+        bulk_done.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=refresh)
+    thread.start()
+    time.sleep(0.5)  # let the refresh drain the bucket
+
+    latencies, overlap = [], []
+    for i in range(args.pages):
+        # the tail of the bulk list is still queued in the bulk pool
+        symbol = f"BULK{args.universe - 1 - i}" if i % 2 else f"PAGE{i}"
+        start = time.perf_counter()
+        client.submit(fake_history, symbol, priority=INTERACTIVE).result()
+        seconds = time.perf_counter() - start
+        (overlap if i % 2 else latencies).append(seconds)
+        time.sleep(max(0.0, args.every - seconds))
+    thread.join()
+
+    latencies.sort()
+    overlap.sort()
+    metrics = resilience.get_scheduler().metrics()
+    print(f"Mode:                 {'flat' if args.flat else 'priority'}")
+    print(f"Bulk refresh:         {args.universe} symbols in {bulk_done[0]:.1f}s")
+    print(f"Page request latency: p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+    print(f"Page asks a queued bulk symbol: p50 {overlap[len(overlap) // 2] * 1000:.0f} ms, "
+          f"max {overlap[-1] * 1000:.0f} ms")
+    print(f"Shed:                 {sum(metrics[name]['shed'] for name in resilience.PRIORITIES.values())}")
@@ -0,0 +1,126 @@
+# ==========================================================
+# breadth.py — Market breadth from one bulk quote snapshot
+# ==========================================================
+#
+# A few chunked yf.download calls return daily bars for the whole
+# universe (all INDIAN_INDICES_FULL members and the F&O list) as
+# (time x symbol) arrays. Advance/decline, % above SMA_50/200 and 52-week highs/lows
+# are column-wise reductions over those arrays.
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from shared_cache import process_cache, shared
+from resilience import InvalidSymbol, circuit, returns_errors
+from functions import INDIAN_INDICES_FULL, fetch_fno_list
+
+SECTORS_URL = "https://archives.nseindia.com/content/indices/ind_nifty500list.csv"
+SECTORS_RETRY_SECONDS = 300  # how long this process goes without sectors before retrying NSE
+
+YEAR_BARS = 252
+SMA_WINDOWS = [50, 200]
+
+SNAPSHOT_CHUNK = 10  # symbols per yf.download; each takes that many upstream tokens
+SNAPSHOT_FIELDS = ["Close", "High", "Low", "Volume"]
+
+
+@process_cache(ttl=86400)
+@shared(ttl=86400)
+def _fetch_sector_map():
+    df = pd.read_csv(SECTORS_URL)
+    return dict(zip(df["Symbol"] + ".NS", df["Industry"]))
+
+
+@process_cache(ttl=SECTORS_RETRY_SECONDS)
+def fetch_sector_map():
+    """{symbol: industry} for NIFTY 500 members, from NSE; empty on failure.
+
+    A failed download raises inside _fetch_sector_map's caches, so the
+    empty map is never shared and is only kept here briefly.
+    """
+    try:
+        return _fetch_sector_map()
+    except Exception:
+        return {}
+
+
+@circuit("download", cost=lambda symbols, period: len(symbols))
+def _download(symbols, period):
+    """One yf.download of a chunk; each symbol is one upstream request."""
+    return yf.download(
+        list(symbols), period=period, interval="1d", group_by="column",
+        auto_adjust=True, threads=True, progress=False,
+    )
+
+
+@returns_errors()
+@process_cache(ttl=900)
+@shared(ttl=900)
+def fetch_snapshot(symbols: tuple, period="1y"):
+    """Daily Close/High/Low/Volume of many symbols from chunked bulk downloads.
+
+    Each chunk takes its own tokens from the upstream scheduler, so the
+    snapshot is paced by the budget and page renders get in between.
+    """
+    chunks = [_download(symbols[i:i + SNAPSHOT_CHUNK], period) for i in range(0, len(symbols), SNAPSHOT_CHUNK)]
+    chunks = [chunk for chunk in chunks if not chunk.empty]
+    if not chunks:
+        raise InvalidSymbol("No price data for the market snapshot")
+    return pd.concat({field: pd.concat([c[field] for c in chunks], axis=1) for field in SNAPSHOT_FIELDS}, axis=1)
+
+
+def market_universe():
+    """Every index and F&O stock, in a stable order (one cache entry)."""
+    return tuple(sorted(set(INDIAN_INDICES_FULL.values()) | set(fetch_fno_list())))
+
+
+def market_breadth(snapshot, sectors=None):
+    """Per-symbol snapshot table and breadth summary.
+
+    Returns (table, summary): table has one row per symbol with the last
+    close, % change, SMA flags, 52-week high/low flags, traded value and
+    sector; summary holds the counts and shares over stocks (indices
+    excluded). Symbols with no bar on the last day are left out rather
+    than counted as unchanged.
+    """
+    close = snapshot["Close"]
+    close = close.loc[:, close.iloc[-1].notna()].ffill()
+    symbols = close.columns
+    c = close.to_numpy(dtype=float)
+    high = snapshot["High"].reindex(columns=symbols).to_numpy(dtype=float)
+    low = snapshot["Low"].reindex(columns=symbols).to_numpy(dtype=float)
+    volume = snapshot["Volume"].reindex(columns=symbols).to_numpy(dtype=float)
+
+    last, prev = c[-1], c[-2]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        change = (last / prev - 1) * 100
+        table = {"Close": last, "Change %": change}
+        for window in SMA_WINDOWS:
+            recent = c[-window:]
+            full = (~np.isnan(recent)).sum(axis=0) == window
+            sma = np.nansum(recent, axis=0) / window
+            table[f"Above SMA_{window}"] = np.where(full, last > sma, np.nan)
+    # fmax/fmin skip NaN without warning on symbols that have no data
+    year_high = np.fmax.reduce(high[-YEAR_BARS:], axis=0)
+    year_low = np.fmin.reduce(low[-YEAR_BARS:], axis=0)
+    table["New High"] = high[-1] >= year_high
+    table["New Low"] = low[-1] <= year_low
+    table["Traded Value"] = last * volume[-1]
+
+    table = pd.DataFrame(table, index=symbols)
+    sectors = sectors or {}
+    is_index = symbols.str.startswith("^")
+    table["Sector"] = np.where(is_index, "Indices", [sectors.get(s, "Other") for s in symbols])
+
+    stocks = table[~is_index & table["Change %"].notna()]
+    summary = {
+        "Stocks": len(stocks),
+        "Advances": int((stocks["Change %"] > 0).sum()),
+        "Declines": int((stocks["Change %"] < 0).sum()),
+        "Unchanged": int((stocks["Change %"] == 0).sum()),
+        "New Highs": int(stocks["New High"].sum()),
+        "New Lows": int(stocks["New Low"].sum()),
+    }
+    for window in SMA_WINDOWS:
+        summary[f"% Above SMA_{window}"] = float(stocks[f"Above SMA_{window}"].mean() * 100)
+    return table, summary
@@ -0,0 +1,152 @@
+# ==========================================================
+# correlation.py — Correlation, beta and volatility matrices
+# ==========================================================
+#
+# Works on the aligned matrix of log returns (time x ticker). Rolling
+# statistics come from cumulative sums, so a window costs two
+# subtractions per series instead of a loop over pairs or windows.
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from numpy.lib.stride_tricks import sliding_window_view
+from functions import fetch_history
+from dataclient import get_data_client
+
+BENCHMARK = "^NSEI"
+MIN_COVERAGE = 0.9  # share of the best-covered ticker's bars a ticker needs to be kept
+
+# bars per year, to annualize volatility
+PERIODS_PER_YEAR = {
+    "1m": 252 * 375, "2m": 252 * 188, "5m": 252 * 75, "15m": 252 * 25,
+    "30m": 252 * 13, "60m": 252 * 7, "90m": 252 * 5, "1h": 252 * 7,
+    "1d": 252, "5d": 52, "1wk": 52, "1mo": 12, "3mo": 4,
+}
+
+
+def close_matrix(tickers, period="1y", interval="1d", min_coverage=MIN_COVERAGE):
+    """Close prices of tickers on their common timestamps.
+
+    Histories are fetched in parallel; tickers that fail to load, or
+    whose history covers less than min_coverage of the best-covered
+    one's bars (a recent listing), are left out, so one short series
+    does not cut every other one down to its length. Returns a DataFrame.
+    """
+    closes = {}
+    hists = get_data_client().map(fetch_history, tickers, period=period, interval=interval)
+    for ticker, hist in zip(tickers, hists):
+        if not isinstance(hist, Exception):
+            closes[ticker] = hist["Close"]
+    if not closes:
+        return pd.DataFrame()
+    close = pd.DataFrame(closes)
+    counts = close.count()
+    close = close.loc[:, counts >= min_coverage * counts.max()]
+    return close.dropna()
+
+
+def log_returns(close):
+    """Log returns as a (T-1, N) float array."""
+    values = close.to_numpy(dtype=float)
+    return np.diff(np.log(values), axis=0)
+
+
+def _window_sums(x, window):
+    """Sums over each trailing window along axis 0 via one cumulative sum."""
+    c = np.cumsum(x, axis=0)
+    c = np.concatenate([np.zeros((1,) + x.shape[1:]), c])
+    return c[window:] - c[:-window]
+
+
+def correlation_matrix(returns):
+    """Full-period correlation matrix (N, N)."""
+    return np.corrcoef(returns, rowvar=False)
+
+
+def volatilities(returns, interval="1d"):
+    """Annualized volatility per column."""
+    return returns.std(axis=0, ddof=1) * np.sqrt(PERIODS_PER_YEAR.get(interval, 252))
+
+
+def betas(returns, benchmark):
+    """Full-period beta of every column against the benchmark series."""
+    r = returns - returns.mean(axis=0)
+    b = benchmark - benchmark.mean()
+    return (r * b[:, None]).sum(axis=0) / (b * b).sum()
+
+
+def rolling_beta_corr(returns, benchmark, window):
+    """Rolling beta and correlation of every column to the benchmark.
+
+    Both are (T - window + 1, N) arrays built from five cumulative sums.
+    """
+    n = window
+    b = benchmark[:, None]
+    sx = _window_sums(returns, n)
+    sb = _window_sums(b, n)
+    sxx = _window_sums(returns * returns, n)
+    sbb = _window_sums(b * b, n)
+    sxb = _window_sums(returns * b, n)
+    cov = sxb - sx * sb / n
+    var_x = sxx - sx * sx / n
+    var_b = sbb - sb * sb / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = cov / var_b
+        corr = cov / np.sqrt(var_x * var_b)
+    return beta, corr
+
+
+def rolling_correlation_matrices(returns, window, step=None):
+    """Correlation matrices over trailing windows ending every `step` bars.
+
+    Means and variances come from cumulative sums; the cross products of
+    all windows are one batched matrix product. Returns (K, N, N).
+    """
+    step = step or window
+    n = window
+    s = _window_sums(returns, n)[::-1][::step][::-1]
+    ss = _window_sums(returns * returns, n)[::-1][::step][::-1]
+    windows = sliding_window_view(returns, n, axis=0)[::-1][::step][::-1]  # (K, N, n)
+    sxy = np.einsum("knw,kmw->knm", windows, windows, optimize=True)
+    cov = sxy - s[:, :, None] * s[:, None, :] / n
+    std = np.sqrt(ss - s * s / n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / (std[:, :, None] * std[:, None, :])
+
+
+@st.cache_data(ttl=3600)
+def correlation_stats(tickers, period="1y", interval="1d", window=20, benchmark=BENCHMARK):
+    """Correlation, betas, volatilities and rolling stats for a universe.
+
+    Cached per (universe, period, interval). Returns a dict of frames,
+    "rolling_matrices": {window end: correlation frame} for back-to-back
+    windows, and "excluded": the tickers close_matrix left out.
+    """
+    universe = [t for t in dict.fromkeys(tickers) if t != benchmark]
+    close = close_matrix([benchmark] + universe, period=period, interval=interval)
+    if close.shape[0] < 3 or benchmark not in close:
+        return None
+    labels = list(close.columns)
+    returns = log_returns(close)
+    bench = returns[:, 0]
+    window = min(window, len(returns))
+
+    corr = correlation_matrix(returns)
+    beta, roll_corr = rolling_beta_corr(returns[:, 1:], bench, window)
+    index = close.index[window:]
+    matrices = rolling_correlation_matrices(returns, window)
+    ends = close.index[np.arange(len(returns) - window + 1)[::-1][::window][::-1] + window]
+    return {
+        "corr": pd.DataFrame(corr, index=labels, columns=labels),
+        "summary": pd.DataFrame({
+            "Beta": betas(returns, bench),
+            "Volatility": volatilities(returns, interval),
+            f"Corr to {benchmark}": corr[0],
+        }, index=labels),
+        "rolling_beta": pd.DataFrame(beta, index=index, columns=labels[1:]),
+        "rolling_corr": pd.DataFrame(roll_corr, index=index, columns=labels[1:]),
+        "rolling_matrices": {
+            end: pd.DataFrame(m, index=labels, columns=labels) for end, m in zip(ends, matrices)
+        },
+        "excluded": [t for t in universe if t not in close],
+    }
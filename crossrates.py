@@ -0,0 +1,129 @@
+# ==========================================================
+# crossrates.py — Forex cross rates from USD legs
+# ==========================================================
+
+import pandas as pd
+import numpy as np
+from functions import fetch_history
+from dataclient import get_data_client
+
+CRYPTO = ["BTC", "ETH", "USDT"]
+
+# Max median relative gap between a triangulated and a direct quote
+CROSS_RATE_TOLERANCE = 0.005
+
+OHLC = ["Open", "High", "Low", "Close"]
+
+
+def leg_ticker(currency: str):
+    """Yahoo ticker of the USD leg for a currency (None for USD itself)."""
+    if currency == "USD":
+        return None
+    if currency in CRYPTO:
+        return f"{currency}-USD"
+    return f"{currency}=X"
+
+
+def direct_ticker(base: str, quote: str):
+    """Yahoo ticker of the direct quote for base/quote."""
+    if base in CRYPTO:
+        return f"{base}-{quote}"
+    return f"{base}{quote}=X"
+
+
+def _align_index(index, interval):
+    """Put leg timestamps on a common axis.
+
+    FX legs are stamped in Europe/London and crypto legs in UTC, so daily
+    and longer bars are matched on the calendar date, intraday bars in UTC.
+    """
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    if interval.endswith(("d", "wk", "mo")):
+        return index.tz_localize(None).normalize()
+    return index.tz_convert("UTC")
+
+
+def usd_value(currency: str, period="6mo", interval="1d"):
+    """OHLC of one unit of currency expressed in USD, or an Exception."""
+    ticker = leg_ticker(currency)
+    hist = fetch_history(ticker, period=period, interval=interval)
+    if isinstance(hist, Exception):
+        return hist
+    df = hist[OHLC].copy(deep=False)
+    df.index = _align_index(df.index, interval)
+    df = df[~df.index.duplicated(keep="last")]
+    if currency not in CRYPTO:
+        # {CUR}=X quotes CUR per USD
+        df = 1 / df
+        df = df.rename(columns={"High": "Low", "Low": "High"})[OHLC]
+    return df
+
+
+def cross_rates(bases, quote: str, period="6mo", interval="1d"):
+    """Cross rates of several bases against one quote currency.
+
+    Only the USD legs are fetched (once per currency, in parallel, shared
+    through the fetch_history cache); every pair is one vectorized
+    division on the timestamps common to both legs. High/Low of a cross are approximated
+    from the legs and clipped to the Open/Close range.
+    Returns a dict base -> DataFrame (or Exception).
+    """
+    currencies = [c for c in set(bases) | {quote} if c != "USD"]
+    values = get_data_client().map(usd_value, currencies, period=period, interval=interval)
+    legs = dict(zip(currencies, values))
+
+    if quote != "USD" and isinstance(legs[quote], Exception):
+        return {base: legs[quote] for base in bases}
+
+    result = {}
+    for base in bases:
+        if base == quote:
+            continue
+        num = legs.get(base)
+        den = legs.get(quote)
+        if isinstance(num, Exception):
+            result[base] = num
+            continue
+        if num is None:
+            # USD/quote
+            index = den.index
+            values = 1 / den[["Open", "Low", "High", "Close"]].to_numpy()
+        elif den is None:
+            # base/USD
+            index = num.index
+            values = num[OHLC].to_numpy()
+        else:
+            index = num.index.intersection(den.index)
+            values = num.loc[index, OHLC].to_numpy() / den.loc[index, ["Open", "Low", "High", "Close"]].to_numpy()
+        df = pd.DataFrame(values, index=index, columns=OHLC)
+        df["High"] = np.fmax(df["High"], df[["Open", "Close"]].max(axis=1))
+        df["Low"] = np.fmin(df["Low"], df[["Open", "Close"]].min(axis=1))
+        df.index.name = "Date" if interval.endswith(("d", "wk", "mo")) else "Datetime"
+        result[base] = df.dropna(how="all")
+    return result
+
+
+def cross_rate(base: str, quote: str, period="6mo", interval="1d"):
+    """Cross rate history of base/quote, or an Exception."""
+    return cross_rates([base], quote, period=period, interval=interval)[base]
+
+
+def compare_to_direct(base: str, quote: str, period="6mo", interval="1d", tolerance=CROSS_RATE_TOLERANCE):
+    """Check a triangulated rate against Yahoo's direct quote.
+
+    Returns (within_tolerance, median relative gap). Costs one extra fetch,
+    so use it for spot checks rather than on every render.
+    """
+    cross = cross_rate(base, quote, period=period, interval=interval)
+    direct = fetch_history(direct_ticker(base, quote), period=period, interval=interval)
+    if isinstance(cross, Exception) or isinstance(direct, Exception) or direct.empty:
+        return False, np.nan
+    close = direct["Close"].copy()
+    close.index = _align_index(close.index, interval)
+    close = close[~close.index.duplicated(keep="last")]
+    index = cross.index.intersection(close.index)
+    if len(index) == 0:
+        return False, np.nan
+    gap = (cross.loc[index, "Close"] / close.loc[index] - 1).abs().median()
+    return bool(gap <= tolerance), float(gap)
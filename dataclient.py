@@ -0,0 +1,120 @@
+# ==========================================================
+# dataclient.py — Background event loop for the fetch_* layer
+# ==========================================================
+#
+# Views submit every request a page needs up front and wait on each one
+# where its section renders, so independent fetches (info, histories,
+# overview tables) run in parallel and each section appears as soon as
+# its own data is in. One asyncio loop per process runs in a daemon
+# thread and is shared by all sessions. The fetch_* functions themselves
+# are blocking (yfinance, requests), so the loop runs them in its
+# executor; identical calls already in flight share one run. Upstream
+# calls are rate-limited and ordered by resilience.UpstreamScheduler.
+
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from shared_cache import cache_key
+from resilience import BULK, INTERACTIVE, PREFETCH, Ticket, current_ticket, get_scheduler, priority
+
+DATA_WORKERS = 16
+BULK_WORKERS = 4  # bulk work gets its own threads, so it never holds up a page
+
+_worker = threading.local()
+
+
+def _mark_worker():
+    _worker.active = True
+
+
+def _run(ticket, func, args, kwargs):
+    with priority(ticket):
+        return func(*args, **kwargs)
+
+
+async def _first(*tasks):
+    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    return done.pop().result()
+
+
+class DataClient:
+    """Runs fetch_* calls on a background asyncio loop.
+
+    submit() returns a concurrent.futures.Future at once; map() waits
+    for a batch. The fetch_* functions return their errors, so
+    result() gives the value or a FetchError, as a direct call would.
+
+    Calls carry a priority class (INTERACTIVE, PREFETCH or BULK, default:
+    the caller's) into the UpstreamScheduler. A higher-priority caller
+    joining an in-flight call boosts it and also runs it in its own
+    pool, taking whichever run finishes first.
+    """
+
+    def __init__(self, workers=DATA_WORKERS, bulk_workers=BULK_WORKERS):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yfd-fetch", initializer=_mark_worker)
+        bulk = ThreadPoolExecutor(max_workers=bulk_workers, thread_name_prefix="yfd-bulk", initializer=_mark_worker)
+        self.executors = {INTERACTIVE: pool, PREFETCH: pool, BULK: bulk}
+        self.inflight = {}  # key -> (task, ticket); only touched on the loop thread
+        self.thread = threading.Thread(target=self.loop.run_forever, name="yfd-data-loop", daemon=True)
+        self.thread.start()
+
+    async def fetch(self, ticket, func, args, kwargs):
+        """Await func(*args, **kwargs) run in the executor of ticket's class."""
+        key = cache_key(func.__name__, func, args, kwargs)
+        entry = self.inflight.get(key)
+        if entry is not None and entry[1].level <= ticket.level:
+            task = entry[0]
+        else:
+            call = functools.partial(_run, ticket, func, args, kwargs)
+            task = self.loop.run_in_executor(self.executors[ticket.level], call)
+            if entry is not None:
+                # A page joining bulk work must not wait for a bulk thread:
+                # run it in this class's pool too and take whichever ends first
+                get_scheduler().boost(entry[1], ticket.level)
+                task = asyncio.ensure_future(_first(entry[0], task))
+            self.inflight[key] = (task, ticket)
+            task.add_done_callback(functools.partial(self._done, key))
+        # one caller giving up must not cancel the run for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self.inflight.get(key, (None,))[0] is task:
+            del self.inflight[key]
+
+    def submit(self, func, *args, priority=None, **kwargs):
+        """Start func(*args, **kwargs) now; returns a Future."""
+        ticket = Ticket(current_ticket().level if priority is None else priority)
+        return asyncio.run_coroutine_threadsafe(self.fetch(ticket, func, args, kwargs), self.loop)
+
+    def map(self, func, items, priority=None, **kwargs):
+        """[func(item, **kwargs) for item in items], fetched in parallel.
+
+        Inside a fetch already running on the executor the calls are made
+        in place, so nested fetches never wait on their own pool.
+        """
+        items = list(items)
+        if getattr(_worker, "active", False):
+            return [func(item, **kwargs) for item in items]
+        futures = [self.submit(func, item, priority=priority, **kwargs) for item in items]
+        return [future.result() for future in futures]
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_data_client():
+    """The process-wide DataClient, started on first use.
+
+    A forked worker (report.py) gets its own: the loop thread does not
+    survive the fork.
+    """
+    global _client
+    with _client_lock:
+        if _client is None or _client.pid != os.getpid():
+            _client = DataClient()
+        return _client
@@ -0,0 +1,143 @@
+# ==========================================================
+# export.py — Chunked Parquet/CSV export and bulk archives
+# ==========================================================
+#
+# Frames are written CHUNK_ROWS rows at a time, so the extra memory an
+# export needs is one chunk, whatever the size of the frame. Archives
+# take frames lazily and write each straight into its zip entry: only
+# one symbol's history is in memory at a time.
+
+import io
+import zipfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from functions import fetch_history
+from indicators import add_indicators
+from resilience import BULK, priority
+
+CHUNK_ROWS = 50_000
+
+FORMATS = {
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "CSV": (".csv", "text/csv"),
+}
+
+
+def _chunks(df, chunk_rows):
+    # a default RangeIndex carries no data
+    drop = isinstance(df.index, pd.RangeIndex) and df.index.name is None
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].reset_index(drop=drop)
+
+
+def _schema(chunk):
+    # object columns that are all null in the first chunk are written as strings
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    for k, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(k, field.with_type(pa.string()))
+    return schema
+
+
+def write_parquet(df, sink, chunk_rows=CHUNK_ROWS):
+    """Write df (with its index) to a binary file object as Parquet."""
+    writer = None
+    for chunk in _chunks(df, chunk_rows):
+        if writer is None:
+            writer = pq.ParquetWriter(sink, _schema(chunk), compression="zstd")
+        writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+    writer.close()
+
+
+def write_csv(df, sink, chunk_rows=CHUNK_ROWS):
+    """Write df (with its index) to a binary file object as UTF-8 CSV."""
+    text = io.TextIOWrapper(sink, encoding="utf-8", newline="", write_through=True)
+    for k, chunk in enumerate(_chunks(df, chunk_rows)):
+        chunk.to_csv(text, header=k == 0, index=False)
+    text.detach()  # leave sink open for the caller
+
+
+def write_frame(df, sink, fmt="Parquet", chunk_rows=CHUNK_ROWS):
+    if fmt == "Parquet":
+        write_parquet(df, sink, chunk_rows)
+    elif fmt == "CSV":
+        write_csv(df, sink, chunk_rows)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+
+def write_archive(frames, sink, fmt="Parquet", chunk_rows=CHUNK_ROWS):
+    """Zip archive with one file per (name, frame) of an iterable.
+
+    Pass a generator to keep a single frame in memory. Returns the names
+    written.
+    """
+    extension = FORMATS[fmt][0]
+    # Parquet is already compressed; CSV compresses well
+    compression = zipfile.ZIP_STORED if fmt == "Parquet" else zipfile.ZIP_DEFLATED
+    names = []
+    with zipfile.ZipFile(sink, "w", compression=compression) as zf:
+        for name, df in frames:
+            with zf.open(name + extension, "w", force_zip64=True) as entry:
+                write_frame(df, entry, fmt, chunk_rows)
+            names.append(name)
+    return names
+
+
+def history_frames(symbols, period="1y", interval="1d", indicators=(), errors=None):
+    """Yield (symbol, history) from the cached fetch_history, one at a time.
+
+    Symbols that fail to load are skipped and recorded in errors.
+    """
+    for symbol in symbols:
+        hist = fetch_history(symbol, period=period, interval=interval)
+        if isinstance(hist, Exception):
+            if errors is not None:
+                errors[symbol] = hist
+            continue
+        yield symbol, add_indicators(hist.copy(deep=False), list(indicators)) if indicators else hist
+
+
+# ==========================================================
+# STREAMLIT
+# ==========================================================
+# st.download_button holds the finished file in memory; only the
+# conversion is chunked. Write to a path for exports beyond that.
+def _buffer(write):
+    sink = io.BytesIO()
+    write(sink)
+    return sink
+
+
+@st.fragment
+def export_panel(df, name, key):
+    """Format choice and a download of df, written only on request."""
+    col1, col2 = st.columns([2, 1])
+    fmt = col1.radio("Export format", list(FORMATS), horizontal=True, key=f"{key}_format")
+    if col2.button("Prepare download", key=f"{key}_prepare"):
+        extension, mime = FORMATS[fmt]
+        data = _buffer(lambda sink: write_frame(df, sink, fmt))
+        st.download_button(
+            f"Download {name}{extension}", data=data,
+            file_name=f"{name}{extension}", mime=mime, key=f"{key}_download",
+        )
+
+
+@st.fragment
+def archive_panel(symbols, name, key, period="1y", interval="1d", indicators=()):
+    """Bulk export of many symbols' histories to one zip archive."""
+    col1, col2 = st.columns([2, 1])
+    fmt = col1.radio("Archive format", list(FORMATS), horizontal=True, key=f"{key}_format")
+    if col2.button(f"Export {len(symbols)} symbols", key=f"{key}_prepare"):
+        errors = {}
+        with st.spinner("Writing archive..."), priority(BULK):
+            frames = history_frames(symbols, period, interval, indicators, errors)
+            data = _buffer(lambda sink: write_archive(frames, sink, fmt))
+        for symbol, error in errors.items():
+            st.warning(f"{symbol}: {error}")
+        st.download_button(
+            f"Download {name}.zip", data=data,
+            file_name=f"{name}.zip", mime="application/zip", key=f"{key}_download",
+        )
@@ -4,6 +4,9 @@
 
 import streamlit as st
 import yfinance as yf
+from yfinance.exceptions import (
+    YFInvalidPeriodError, YFPricesMissingError, YFTickerMissingError, YFTzMissingError,
+)
 import pandas as pd
 import datetime
 import requests
@@ -11,6 +14,15 @@ import random
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.colors as pc
+from zoneinfo import ZoneInfo
+from streamlit_javascript import st_javascript
+from shared_cache import shared, process_cache
+from resilience import InvalidSymbol, circuit, returns_errors
+from fundamentals import fetch_statements, statement_table
+
+# Cached frames are shared by all sessions (see shared_cache.process_cache);
+# with copy-on-write a shallow copy can be extended without touching them.
+pd.set_option("mode.copy_on_write", True)
 
 
 # ==========================================================
@@ -39,32 +51,114 @@ INDIAN_INDICES = {
     "INDIA VIX": "^INDIAVIX",
 }
 
+# Display name -> symbol, one entry per index (for pickers)
+INDIAN_INDICES_FULL = {
+    "NIFTY 50": "^NSEI",
+    "SENSEX": "^BSESN",
+    "BANKNIFTY": "^NSEBANK",
+    "FINNIFTY": "^CNXFIN",
+    "NIFTY NEXT 50": "^NSMIDCP",
+    "NIFTY MIDCAP 50": "^NSEMDCP50",
+    "NIFTY MIDCAP 100": "^NSEMDCP100",
+    "NIFTY SMALLCAP 50": "^NSESMLCP50",
+    "NIFTY SMALLCAP 100": "^NSESMLCP100",
+    "NIFTY FMCG": "^CNXFMCG",
+    "NIFTY IT": "^CNXIT",
+    "NIFTY AUTO": "^CNXAUTO",
+    "NIFTY METAL": "^CNXMETAL",
+    "NIFTY PHARMA": "^CNXPHARMA",
+    "NIFTY REALTY": "^CNXREALTY",
+    "NIFTY ENERGY": "^CNXENERGY",
+    "NIFTY PSU BANK": "^CNXPSUBANK",
+    "INDIA VIX": "^INDIAVIX",
+}
+
+
+# ==========================================================
+# TIMEZONE
+# ==========================================================
+DEFAULT_TIMEZONE = ZoneInfo("Asia/Kolkata")
+
+BROWSER_TIMEZONE_JS = """await (async () => {
+                const userTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
+                return userTimezone
+                })().then(returnValue => returnValue)"""
+
+
+def init_timezone():
+    """Seed the session timezone with the server-side default."""
+    if "timezone" not in st.session_state:
+        st.session_state["timezone"] = DEFAULT_TIMEZONE
+
+
+def now_utc():
+    """Current time as an aware UTC datetime, without microseconds."""
+    return datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+
+@st.fragment
+def show_last_update(timestamp):
+    """Show a UTC timestamp in the browser timezone.
+
+    The browser timezone is read inside this fragment, so when it comes
+    back only the fragment reruns; the page keeps DEFAULT_TIMEZONE until then.
+    """
+    if not st.session_state.get("browser_timezone_resolved"):
+        timezone = st_javascript(BROWSER_TIMEZONE_JS, key="browser_timezone")
+        if isinstance(timezone, str) and timezone:
+            try:
+                st.session_state["timezone"] = ZoneInfo(timezone)
+            except Exception:
+                pass
+            st.session_state["browser_timezone_resolved"] = True
+    local = timestamp.astimezone(st.session_state["timezone"])
+    st.write("Last update:", local.replace(tzinfo=None))
+
 
 # ==========================================================
 # FETCH F&O LIST
 # ==========================================================
-@st.cache_data(ttl=86400)
+FNO_FALLBACK = [
+    "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
+    "SBIN.NS", "LT.NS", "AXISBANK.NS", "ITC.NS", "BHARTIARTL.NS",
+    "MARUTI.NS", "KOTAKBANK.NS", "BAJFINANCE.NS", "HCLTECH.NS",
+    "SUNPHARMA.NS", "TITAN.NS", "ONGC.NS", "WIPRO.NS", "ULTRACEMCO.NS",
+]
+FNO_RETRY_SECONDS = 300  # how long this process keeps the fallback before retrying NSE
+
+
+@process_cache(ttl=86400)
+@shared(ttl=86400)
+def _fetch_fno_list():
+    url = "https://archives.nseindia.com/content/fo/fo_underlyinglist.csv"
+    df = pd.read_csv(url)
+    symbols = sorted(df["SYMBOL"].unique())
+    return [f"{s}.NS" for s in symbols]
+
+
+@process_cache(ttl=FNO_RETRY_SECONDS)
 def fetch_fno_list():
-    """Fetch NSE F&O stock list from NSE official site."""
+    """Fetch NSE F&O stock list from NSE official site.
+
+    A failed download raises inside _fetch_fno_list's caches, so the
+    fallback list is never shared and is only kept here briefly.
+    """
     try:
-        url = "https://archives.nseindia.com/content/fo/fo_underlyinglist.csv"
-        df = pd.read_csv(url)
-        symbols = sorted(df["SYMBOL"].unique())
-        return [f"{s}.NS" for s in symbols]
+        return _fetch_fno_list()
     except Exception:
-        # fallback list
-        return [
-            "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
-            "SBIN.NS", "LT.NS", "AXISBANK.NS", "ITC.NS", "BHARTIARTL.NS",
-            "MARUTI.NS", "KOTAKBANK.NS", "BAJFINANCE.NS", "HCLTECH.NS",
-            "SUNPHARMA.NS", "TITAN.NS", "ONGC.NS", "WIPRO.NS", "ULTRACEMCO.NS",
-        ]
+        return FNO_FALLBACK
 
 
 # ==========================================================
 # CORE FETCHING FUNCTIONS
 # ==========================================================
-@st.cache_data(ttl=3600)
+# Each fetch_* raises inside its caches, so failures are never cached
+# for the full TTL, and returns a FetchError to the views instead:
+# InvalidSymbol (remembered for NEGATIVE_TTL) or UpstreamUnavailable.
+@returns_errors()
+@process_cache(ttl=3600)
+@shared(ttl=3600)
+@circuit("info")
 def fetch_info(ticker: str):
     """Fetch stock or index info from Yahoo Finance."""
     ticker = ticker.upper().strip()
@@ -72,76 +166,83 @@ def fetch_info(ticker: str):
     if ticker in INDIAN_INDICES:
         ticker = INDIAN_INDICES[ticker]
 
-    try:
-        if not ticker.endswith((".NS", ".BO", "=X", "^")):
-            for suffix in [".NS", ".BO"]:
-                t = yf.Ticker(ticker + suffix)
-                info = t.info
-                if info and "quoteType" in info:
-                    return info
+    if not ticker.endswith((".NS", ".BO", "=X", "^")):
+        for suffix in [".NS", ".BO"]:
+            try:
+                info = yf.Ticker(ticker + suffix).info
+            except Exception:
+                continue
+            if info and "quoteType" in info:
+                return info
 
-        ticker_obj = yf.Ticker(ticker)
-        return ticker_obj.info
-    except Exception as e:
-        return e
+    info = yf.Ticker(ticker).info
+    if not info or "quoteType" not in info:
+        raise InvalidSymbol(f"No quote found for {ticker}")
+    return info
 
 
-@st.cache_data(ttl=3600)
+@returns_errors()
+@process_cache(ttl=3600)
+@shared(ttl=3600)
+@circuit("history")
 def fetch_history(ticker: str, period="6mo", interval="1d"):
     """Fetch historical price data."""
     try:
-        ticker_obj = yf.Ticker(ticker)
-        return ticker_obj.history(period=period, interval=interval)
-    except Exception as e:
-        return e
+        hist = yf.Ticker(ticker).history(period=period, interval=interval, raise_errors=True)
+    except (YFPricesMissingError, YFTzMissingError, YFTickerMissingError, YFInvalidPeriodError) as e:
+        raise InvalidSymbol(str(e)) from e
+    if hist.empty:
+        raise InvalidSymbol(f"No price data for {ticker} ({period}, {interval})")
+    return hist
 
 
-@st.cache_data(ttl=3600)
+# Statements change at most once a quarter: they come from the
+# persistent store in fundamentals.py, which only re-queries a ticker
+# once its next report is due.
 def fetch_balance(ticker: str, tp="Annual"):
     """Fetch balance sheet data."""
-    try:
-        ticker_obj = yf.Ticker(ticker)
-        if tp == "Annual":
-            return ticker_obj.balance_sheet
-        return ticker_obj.quarterly_balance_sheet
-    except Exception as e:
-        return e
+    return _statement(ticker, "Balance Sheet", tp)
 
 
-@st.cache_data(ttl=3600)
 def fetch_income(ticker: str, tp="Annual"):
     """Fetch income statement data."""
-    try:
-        ticker_obj = yf.Ticker(ticker)
-        if tp == "Annual":
-            return ticker_obj.income_stmt
-        return ticker_obj.quarterly_income_stmt
-    except Exception as e:
-        return e
+    return _statement(ticker, "Income Statement", tp)
 
 
-@st.cache_data(ttl=3600)
 def fetch_cash(ticker: str, tp="Annual"):
     """Fetch cash flow data."""
-    try:
-        ticker_obj = yf.Ticker(ticker)
-        if tp == "Annual":
-            return ticker_obj.cashflow
-        return ticker_obj.quarterly_cashflow
-    except Exception as e:
-        return e
+    return _statement(ticker, "Cash Flow", tp)
+
+
+def _statement(ticker, statement, tp):
+    frame = fetch_statements(ticker)
+    if isinstance(frame, Exception):
+        return frame
+    table = statement_table(frame, ticker, statement, tp)
+    if table.empty:
+        return InvalidSymbol(f"No {statement.lower()} for {ticker}")
+    return table
 
 
-@st.cache_data(ttl=3600)
+@returns_errors()
+@process_cache(ttl=3600)
+@shared(ttl=3600)
+@circuit("tables")
 def fetch_table(url: str):
     """Fetch Yahoo Finance tables."""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        df_list = pd.read_html(response.content)
-        return df_list[0]
-    except Exception as e:
-        return e
+    headers = {"User-Agent": "Mozilla/5.0"}
+    response = requests.get(url, headers=headers, timeout=10)
+    response.raise_for_status()
+    df_list = pd.read_html(response.content)
+    return df_list[0]
+
+
+def show_error(error):
+    """Render a FetchError returned by a fetch_* function."""
+    if isinstance(error, InvalidSymbol):
+        st.warning(error, icon=":material/search_off:")
+    else:
+        st.error(error, icon=":material/cloud_off:")
 
 
 def remove_duplicates(lst):
@@ -155,9 +256,192 @@ def remove_duplicates(lst):
     return result
 
 
+# ==========================================================
+# DATA TABLES
+# ==========================================================
+PAGE_SIZES = [25, 50, 100, 250]
+
+# info key -> label shown in the info tables
+INFO_FIELDS = {
+    "longName": "Name",
+    "quoteType": "Type",
+    "exchange": "Exchange",
+    "currency": "Currency",
+    "sector": "Sector",
+    "industry": "Industry",
+    "marketCap": "Market Cap",
+    "trailingPE": "P/E",
+    "priceToBook": "P/B",
+    "dividendYield": "Dividend Yield",
+    "beta": "Beta",
+    "fiftyTwoWeekLow": "52W Low",
+    "fiftyTwoWeekHigh": "52W High",
+    "averageVolume": "Avg Volume",
+}
+
+
+def info_table(info):
+    """Selected info fields as a one-column DataFrame indexed by label."""
+    rows = {label: info[key] for key, label in INFO_FIELDS.items() if info.get(key) is not None}
+    return pd.DataFrame.from_dict(rows, orient="index").astype(str)
+
+
+def paged_table(df, key, label="Show data", hide_index=False):
+    """Data table that is only built once toggled on, one page at a time.
+
+    Only the visible rows are serialized to the browser; paging reruns
+    the fragment, not the page.
+    """
+    if st.toggle(label, key=f"{key}_show"):
+        _table_page(df, key, hide_index)
+
+
+@st.fragment
+def _table_page(df, key, hide_index):
+    col1, col2, col3 = st.columns([1, 1, 2])
+    size = col1.selectbox("Rows per page", PAGE_SIZES, key=f"{key}_size")
+    pages = max(1, -(-len(df) // size))
+    page = col2.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page_{size}")
+    start = (min(page, pages) - 1) * size
+    stop = min(start + size, len(df))
+    col3.caption(f"Rows {start + 1 if len(df) else 0}–{stop} of {len(df)}")
+    st.dataframe(df.iloc[start:stop].reset_index(), hide_index=hide_index)
+
+
 # ==========================================================
 # VISUALIZATION HELPERS
 # ==========================================================
+# indicator columns drawn in their own panel under the price
+OSCILLATORS = {"MACD": ["MACD", "Signal", "MACD_Hist"], "RSI": ["RSI"], "ATR": ["ATR"]}
+
+# Above this many points in a figure, line traces are drawn with WebGL;
+# SVG paths with tens of thousands of points stall the browser.
+WEBGL_POINTS = 5_000
+
+
+def line_trace(points):
+    """Trace class for line series: go.Scattergl above WEBGL_POINTS, else go.Scatter."""
+    return go.Scattergl if points > WEBGL_POINTS else go.Scatter
+
+
+def plot_line_multiple(df, title="", column="Pct_change"):
+    """One line per Ticker of a long-format frame, in percent change.
+
+    Series are pivoted onto one shared time axis, so all traces reuse the
+    same x array. column is computed from Close if the frame lacks it.
+    """
+    if column not in df:
+        df = df.assign(**{column: df["Close"] / df.groupby("Ticker")["Close"].transform("first") - 1})
+    wide = df.pivot(columns="Ticker", values=column)
+    x = wide.index.to_numpy()
+    trace = line_trace(int(wide.notna().to_numpy().sum()))
+    fig = go.Figure()
+    for ticker in wide.columns:
+        fig.add_trace(trace(x=x, y=wide[ticker].to_numpy() * 100, name=ticker, mode="lines", connectgaps=True))
+    fig.update_layout(title=title, yaxis_title="Change (%)", hovermode="x", height=500)
+    return fig
+
+
+def plot_candles_stick(df, title=""):
+    fig = go.Figure(go.Candlestick(
+        x=df.index, open=df["Open"], high=df["High"], low=df["Low"], close=df["Close"], name="Price",
+    ))
+    fig.update_layout(title=title, xaxis_rangeslider_visible=False, height=400)
+    return fig
+
+
+# price-level columns drawn over the candles
+OVERLAYS = ("SMA_", "EMA_", "VWAP", "AVWAP")
+
+
+def plot_candles_stick_bar(df, title="", currency="", profile=None, levels=None):
+    """Candlesticks with SMA/EMA/VWAP overlays, and panels for volume and oscillators.
+
+    profile (Price/Volume bins) is drawn as horizontal bars on the right of
+    the price panel; levels ({name: price}, e.g. POC/VAH/VAL) as lines.
+    """
+    panels = (["Volume"] if "Volume" in df else []) + [k for k in OSCILLATORS if k in df]
+    rows = 1 + len(panels)
+    fig = make_subplots(
+        rows=rows, cols=1, shared_xaxes=True, vertical_spacing=0.03,
+        row_heights=[0.6] + [0.4 / len(panels)] * len(panels) if panels else [1.0],
+    )
+    x = df.index.to_numpy()
+    line = line_trace(len(df) * (1 + len(panels)))
+    fig.add_trace(go.Candlestick(
+        x=x, open=df["Open"], high=df["High"], low=df["Low"], close=df["Close"], name="Price",
+    ), row=1, col=1)
+    for column in df.columns:
+        if column.startswith(OVERLAYS):
+            fig.add_trace(line(x=x, y=df[column], name=column, line=dict(width=1)), row=1, col=1)
+
+    if profile is not None and not profile.empty:
+        # own x axis over the price panel; the reversed range puts the bars
+        # on the right, using at most a quarter of the width
+        axis = f"xaxis{rows + 1}"
+        fig.add_trace(go.Bar(
+            x=profile["Volume"], y=profile["Price"], orientation="h", name="Volume Profile",
+            marker_color="rgba(100, 100, 200, 0.3)", xaxis=f"x{rows + 1}", yaxis="y",
+        ))
+        fig.update_layout(**{axis: dict(
+            overlaying="x", anchor="y", range=[profile["Volume"].max() * 4, 0],
+            showgrid=False, showticklabels=False,
+        )})
+    for name, price in (levels or {}).items():
+        fig.add_hline(y=price, line_dash="dash", line_width=1, line_color="grey",
+                      annotation_text=name, annotation_position="left", row=1, col=1)
+
+    for row, panel in enumerate(panels, start=2):
+        if panel == "Volume":
+            colors = ["green" if c >= o else "red" for o, c in zip(df["Open"], df["Close"])]
+            fig.add_trace(go.Bar(x=x, y=df["Volume"], name="Volume", marker_color=colors), row=row, col=1)
+        elif panel == "MACD":
+            fig.add_trace(go.Bar(x=x, y=df["MACD_Hist"], name="MACD_Hist"), row=row, col=1)
+            fig.add_trace(line(x=x, y=df["MACD"], name="MACD"), row=row, col=1)
+            fig.add_trace(line(x=x, y=df["Signal"], name="Signal"), row=row, col=1)
+        else:
+            fig.add_trace(line(x=x, y=df[panel], name=panel), row=row, col=1)
+            if panel == "RSI":
+                fig.add_hline(y=70, line_dash="dot", line_color="grey", row=row, col=1)
+                fig.add_hline(y=30, line_dash="dot", line_color="grey", row=row, col=1)
+        fig.update_yaxes(title_text=panel, row=row, col=1)
+
+    fig.update_yaxes(title_text=f"Price ({currency})" if currency else "Price", row=1, col=1)
+    fig.update_layout(title=title, xaxis_rangeslider_visible=False, height=500 + 150 * len(panels))
+    return fig
+
+
+def plot_multi_timeframe(frames, title=""):
+    """Candlesticks of several intervals stacked on one shared time axis.
+
+    All panels use the same x axis, so the crosshair spike and the hover
+    (hoversubplots="axis") follow the cursor through every timeframe.
+    """
+    fig = go.Figure()
+    n, gap = len(frames), 0.04
+    height = (1 - gap * (n - 1)) / n
+    axes = {}
+    for k, (interval, df) in enumerate(frames.items()):
+        suffix = "" if k == 0 else str(k + 1)
+        fig.add_trace(go.Candlestick(
+            x=df.index, open=df["Open"], high=df["High"], low=df["Low"], close=df["Close"],
+            name=interval, xaxis="x", yaxis=f"y{suffix}",
+        ))
+        top = 1 - k * (height + gap)
+        axes[f"yaxis{suffix}"] = dict(domain=[max(0.0, top - height), top], title=interval, showspikes=True,
+                                      spikemode="across", spikesnap="cursor")
+    fig.update_layout(
+        title=title,
+        height=300 * n,
+        hovermode="x",
+        hoversubplots="axis",
+        spikedistance=-1,
+        xaxis=dict(rangeslider_visible=False, showspikes=True, spikemode="across", spikesnap="cursor"),
+        **axes,
+    )
+    return fig
+
+
 def plot_balance(df, ticker="", currency="INR"):
     df.columns = pd.to_datetime(df.columns).strftime("%Y")
     fig = go.Figure()
@@ -215,3 +499,42 @@ def plot_capital(df, ticker="", currency="INR"):
         yaxis_title=f"Amount ({currency})",
     )
     return fig
+
+
+def plot_treemap(table, title="", value="Traded Value", color="Change %", parent="Sector"):
+    """Treemap of symbols grouped by parent, sized by value and colored by color."""
+    table = table[table[value] > 0]
+    groups = sorted(table[parent].unique())
+    fig = go.Figure(go.Treemap(
+        ids=groups + list(table.index),
+        labels=groups + list(table.index),
+        parents=[""] * len(groups) + list(table[parent]),
+        values=[0] * len(groups) + list(table[value]),
+        marker=dict(
+            colors=[0] * len(groups) + list(table[color].fillna(0)),
+            colorscale="RdYlGn", cmid=0, cmin=-5, cmax=5,
+            colorbar=dict(title=color),
+        ),
+        customdata=[0] * len(groups) + list(table[color].fillna(0)),
+        texttemplate="%{label}<br>%{customdata:+.2f}%",
+        hovertemplate="%{label}<br>%{customdata:+.2f}%<extra></extra>",
+    ))
+    fig.update_layout(title=title, height=650, margin=dict(t=50, l=10, r=10, b=10))
+    return fig
+
+
+def plot_heatmap(df, title="", zmin=-1, zmax=1):
+    fig = go.Figure(go.Heatmap(
+        z=df.to_numpy(),
+        x=list(df.columns),
+        y=list(df.index),
+        zmin=zmin,
+        zmax=zmax,
+        colorscale="RdBu",
+    ))
+    fig.update_layout(
+        title=title,
+        yaxis_autorange="reversed",
+        height=max(400, 18 * len(df.index)),
+    )
+    return fig
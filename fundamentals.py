@@ -0,0 +1,261 @@
+# ==========================================================
+# fundamentals.py — Multi-ticker financial statements loader
+# ==========================================================
+
+import os
+import json
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+import yfinance as yf
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from resilience import InvalidSymbol, UpstreamUnavailable, circuit, returns_errors
+
+# statement -> (annual attribute, quarterly attribute) on yf.Ticker
+STATEMENTS = {
+    "Balance Sheet": ("balance_sheet", "quarterly_balance_sheet"),
+    "Income Statement": ("income_stmt", "quarterly_income_stmt"),
+    "Cash Flow": ("cashflow", "quarterly_cashflow"),
+}
+FREQUENCIES = ["Annual", "Quarterly"]
+
+COLUMNS = ["ticker", "statement", "frequency", "period_end", "line_item", "value"]
+
+MAX_WORKERS = 8
+
+STORE_DIR_ENV = "YFD_FUNDAMENTALS_DIR"
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "fundamentals")
+KEEP_VERSIONS = 4
+
+# Days after a period end within which results are published
+# (SEBI LODR: 45 days for a quarter, 60 for the year-end quarter)
+QUARTER_LAG_DAYS = 45
+YEAR_END_LAG_DAYS = 60
+RECHECK_DAYS = 1  # retry interval once a report is overdue
+
+
+def tidy_statement(df, ticker, statement, frequency):
+    """Wide yfinance statement (items x periods) to long format."""
+    long = (
+        df.rename_axis(index="line_item", columns="period_end")
+        .stack(future_stack=True)
+        .rename("value")
+        .reset_index()
+    )
+    long["ticker"] = ticker
+    long["statement"] = statement
+    long["frequency"] = frequency
+    long["period_end"] = pd.to_datetime(long["period_end"])
+    long["value"] = pd.to_numeric(long["value"], errors="coerce")
+    return long.dropna(subset=["value"])[COLUMNS]
+
+
+# ==========================================================
+# PERSISTENT STORE
+# ==========================================================
+class FundamentalsStore:
+    """Versioned on-disk statements, one directory per ticker.
+
+    <root>/<ticker>/v<n>.parquet holds the long-format statements and
+    manifest.json the current version, the latest fiscal period per
+    frequency and when the next report is due. A new version is only
+    written when a download brings a changed set of periods or values.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+
+    def _dir(self, ticker):
+        return os.path.join(self.root, ticker.replace("/", "_"))
+
+    def manifest(self, ticker):
+        try:
+            with open(os.path.join(self._dir(ticker), "manifest.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_manifest(self, ticker, manifest):
+        path = os.path.join(self._dir(ticker), "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def version(self, ticker):
+        manifest = self.manifest(ticker)
+        return manifest["version"] if manifest else 0
+
+    def is_due(self, ticker, now=None):
+        manifest = self.manifest(ticker)
+        if manifest is None:
+            return True
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        return now >= datetime.datetime.fromisoformat(manifest["next_due"])
+
+    def load(self, ticker):
+        manifest = self.manifest(ticker)
+        if manifest is None:
+            return None
+        path = os.path.join(self._dir(ticker), f"v{manifest['version']}.parquet")
+        try:
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+
+    def save(self, ticker, frame, next_due):
+        """Store frame if it changed; always record the next due date."""
+        with self.lock:
+            os.makedirs(self._dir(ticker), exist_ok=True)
+            manifest = self.manifest(ticker)
+            current = self.load(ticker)
+            version = manifest["version"] if manifest else 0
+            if current is None or not _same(current, frame):
+                version += 1
+                path = os.path.join(self._dir(ticker), f"v{version}.parquet")
+                frame.to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+                stale = os.path.join(self._dir(ticker), f"v{version - KEEP_VERSIONS}.parquet")
+                if os.path.exists(stale):
+                    os.remove(stale)
+            latest = frame.groupby("frequency")["period_end"].max()
+            self._write_manifest(ticker, {
+                "version": version,
+                "latest_period": {k: v.isoformat() for k, v in latest.items()},
+                "checked_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "next_due": next_due.isoformat(),
+            })
+            return version
+
+
+def _same(a, b):
+    key = ["statement", "frequency", "period_end", "line_item"]
+    a = a.sort_values(key).reset_index(drop=True)
+    b = b.sort_values(key).reset_index(drop=True)
+    return a[COLUMNS].equals(b[COLUMNS])
+
+
+_store = None
+
+
+def get_store():
+    """Store under YFD_FUNDAMENTALS_DIR (default .cache/fundamentals)."""
+    global _store
+    if _store is None:
+        _store = FundamentalsStore(os.environ.get(STORE_DIR_ENV, STORE_DIR))
+    return _store
+
+
+def next_report_due(frame, earnings_dates=(), now=None):
+    """When a ticker next needs to be re-queried.
+
+    The next earnings date from the calendar when there is one, otherwise
+    the end of the quarter after the latest reported one plus the
+    publication lag. An overdue report is retried every RECHECK_DAYS.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    # a day after the announcement, for the statements to reach Yahoo
+    upcoming = [_utc(d) + pd.Timedelta(days=1) for d in earnings_dates]
+    upcoming = sorted(d for d in upcoming if d > now)
+    if upcoming:
+        due = upcoming[0]
+    else:
+        latest = frame["period_end"].max()
+        next_end = (latest + pd.offsets.QuarterEnd(1)).normalize()
+        lag = YEAR_END_LAG_DAYS if next_end.month == 3 else QUARTER_LAG_DAYS
+        due = _utc(next_end) + pd.Timedelta(days=lag)
+    if due <= now:
+        due = pd.Timestamp(now) + pd.Timedelta(days=RECHECK_DAYS)
+    return due.to_pydatetime()
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+
+def _earnings_dates(ticker_obj):
+    try:
+        calendar = ticker_obj.calendar or {}
+        return list(calendar.get("Earnings Date", []))
+    except Exception:
+        return []
+
+
+@circuit("fundamentals", cost=len(STATEMENTS) * len(FREQUENCIES) + 1)  # + the earnings calendar
+def download_statements(ticker: str):
+    """All statements of one ticker, annual and quarterly, in long format.
+
+    One yf.Ticker serves the six requests (and the earnings calendar),
+    so they share its session. Returns (frame, earnings dates).
+    """
+    ticker_obj = yf.Ticker(ticker)
+    frames = []
+    for statement, attributes in STATEMENTS.items():
+        for frequency, attribute in zip(FREQUENCIES, attributes):
+            df = getattr(ticker_obj, attribute)
+            if df is not None and not df.empty:
+                frames.append(tidy_statement(df, ticker, statement, frequency))
+    if not frames:
+        raise InvalidSymbol(f"No financial statements for {ticker}")
+    return pd.concat(frames, ignore_index=True), _earnings_dates(ticker_obj)
+
+
+@returns_errors()
+@st.cache_data(ttl=3600)
+def fetch_statements(ticker: str):
+    """Statements of one ticker, served from the store until a report is due."""
+    store = get_store()
+    if not store.is_due(ticker):
+        frame = store.load(ticker)
+        if frame is not None:
+            return frame
+    try:
+        frame, earnings_dates = download_statements(ticker)
+    except UpstreamUnavailable:
+        frame = store.load(ticker)
+        if frame is not None:
+            return frame
+        raise
+    store.save(ticker, frame, next_report_due(frame, earnings_dates))
+    return frame
+
+
+def load_fundamentals(tickers, max_workers=MAX_WORKERS):
+    """Statements for many tickers, fetched concurrently.
+
+    Returns (long-format frame, {ticker: FetchError}) so a peer set of
+    ten companies loads in roughly the time of the slowest one.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(tickers))),
+        initializer=lambda: add_script_run_ctx(ctx=ctx) if ctx else None,
+    ) as pool:
+        results = list(pool.map(fetch_statements, tickers))
+
+    frames, errors = [], {}
+    for ticker, result in zip(tickers, results):
+        if isinstance(result, Exception):
+            errors[ticker] = result
+        else:
+            frames.append(result)
+    if frames:
+        frame = pd.concat(frames, ignore_index=True)
+    else:
+        frame = pd.DataFrame(columns=COLUMNS)
+    return frame, errors
+
+
+def statement_table(frame, ticker, statement, frequency="Annual"):
+    """Back to the wide layout of a single yfinance statement."""
+    rows = frame[
+        (frame["ticker"] == ticker)
+        & (frame["statement"] == statement)
+        & (frame["frequency"] == frequency)
+    ]
+    table = rows.pivot(index="line_item", columns="period_end", values="value")
+    return table[sorted(table.columns, reverse=True)]
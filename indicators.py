@@ -0,0 +1,363 @@
+# ==========================================================
+# indicators.py — Technical indicators (batch and incremental)
+# ==========================================================
+#
+# add_indicators() is the vectorized version used on a full history.
+# The classes below compute the same values one bar at a time in O(1):
+# update() appends a bar, revise() replaces the last one (a 1m bar that
+# is still forming). IndicatorSet.sync() feeds them only the bars that
+# are new since the previous rerun.
+
+import math
+import threading
+from collections import deque
+import pandas as pd
+import streamlit as st
+
+RSI_WINDOW = 14
+ATR_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+
+def columns_for(indicator: str):
+    """Columns an indicator adds to the frame."""
+    if indicator == "MACD":
+        return ["MACD", "Signal", "MACD_Hist"]
+    return [indicator]
+
+
+# ==========================================================
+# BATCH
+# ==========================================================
+def add_indicators(df, indicators):
+    """Add indicator columns (SMA_n, EMA_n, ATR, MACD, RSI) to df in place."""
+    for indicator in indicators:
+        if "SMA" in indicator:
+            window = int(indicator.split("_")[1])
+            df[indicator] = df['Close'].rolling(window=window, min_periods=1).mean()
+        if "EMA" in indicator:
+            window = int(indicator.split("_")[1])
+            df[indicator] = df['Close'].ewm(span=window, adjust=False, min_periods=1).mean()
+
+    if "ATR" in indicators:
+        prev_close = df['Close'].shift(1)
+        tr = pd.concat([
+            df['High'] - df['Low'],
+            (df['High'] - prev_close).abs(),
+            (df['Low'] - prev_close).abs(),
+        ], axis=1).max(axis=1)
+        df['ATR'] = tr.rolling(window=ATR_WINDOW, min_periods=1).mean()
+
+    if "MACD" in indicators:
+        ema_short = df['Close'].ewm(span=MACD_FAST, adjust=False, min_periods=1).mean()
+        ema_long = df['Close'].ewm(span=MACD_SLOW, adjust=False, min_periods=1).mean()
+        df['MACD'] = ema_short - ema_long
+        df['Signal'] = df['MACD'].ewm(span=MACD_SIGNAL, adjust=False, min_periods=1).mean()
+        df['MACD_Hist'] = df['MACD'] - df['Signal']
+
+    if "RSI" in indicators:
+        delta = df['Close'].pct_change(periods=1) * 100
+        gain = (delta.where(delta > 0, 0)).rolling(window=RSI_WINDOW, min_periods=1).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=RSI_WINDOW, min_periods=1).mean()
+        rs = gain / loss
+        df['RSI'] = 100 - (100 / (1 + rs))
+
+    return df
+
+
+# ==========================================================
+# INCREMENTAL PRIMITIVES
+# ==========================================================
+class RollingMean:
+    """Mean of the last `window` values (NaN skipped, min_periods=1)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.count = 0
+
+    def _add(self, x):
+        if not math.isnan(x):
+            self.total += x
+            self.count += 1
+
+    def _remove(self, x):
+        if not math.isnan(x):
+            self.total -= x
+            self.count -= 1
+
+    @property
+    def value(self):
+        return self.total / self.count if self.count else math.nan
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+        return self.value
+
+    def revise(self, x):
+        self._remove(self.values[-1])
+        self.values[-1] = x
+        self._add(x)
+        return self.value
+
+
+class EMA:
+    """Exponential moving average, pandas ewm(adjust=False) semantics."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self.value = math.nan
+        self.before = math.nan
+
+    def update(self, x):
+        self.before = self.value
+        return self._apply(x)
+
+    def revise(self, x):
+        self.value = self.before
+        return self._apply(x)
+
+    def _apply(self, x):
+        if math.isnan(self.value):
+            self.value = x
+        elif not math.isnan(x):
+            self.value = (1 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+# ==========================================================
+# INCREMENTAL INDICATORS
+# ==========================================================
+class SMA:
+    def __init__(self, window):
+        self.name = f"SMA_{window}"
+        self.mean = RollingMean(window)
+
+    def update(self, bar):
+        return {self.name: self.mean.update(bar["Close"])}
+
+    def revise(self, bar):
+        return {self.name: self.mean.revise(bar["Close"])}
+
+
+class EMAIndicator:
+    def __init__(self, span):
+        self.name = f"EMA_{span}"
+        self.ema = EMA(span)
+
+    def update(self, bar):
+        return {self.name: self.ema.update(bar["Close"])}
+
+    def revise(self, bar):
+        return {self.name: self.ema.revise(bar["Close"])}
+
+
+class ATR:
+    def __init__(self, window=ATR_WINDOW):
+        self.mean = RollingMean(window)
+        self.prev_close = math.nan
+        self.close_before = math.nan
+
+    def _true_range(self, bar, prev_close):
+        ranges = [bar["High"] - bar["Low"]]
+        if not math.isnan(prev_close):
+            ranges += [abs(bar["High"] - prev_close), abs(bar["Low"] - prev_close)]
+        return max(ranges)
+
+    def update(self, bar):
+        self.close_before = self.prev_close
+        value = self.mean.update(self._true_range(bar, self.prev_close))
+        self.prev_close = bar["Close"]
+        return {"ATR": value}
+
+    def revise(self, bar):
+        value = self.mean.revise(self._true_range(bar, self.close_before))
+        self.prev_close = bar["Close"]
+        return {"ATR": value}
+
+
+class MACD:
+    def __init__(self):
+        self.fast = EMA(MACD_FAST)
+        self.slow = EMA(MACD_SLOW)
+        self.signal = EMA(MACD_SIGNAL)
+
+    def _output(self, macd, signal):
+        return {"MACD": macd, "Signal": signal, "MACD_Hist": macd - signal}
+
+    def update(self, bar):
+        macd = self.fast.update(bar["Close"]) - self.slow.update(bar["Close"])
+        return self._output(macd, self.signal.update(macd))
+
+    def revise(self, bar):
+        macd = self.fast.revise(bar["Close"]) - self.slow.revise(bar["Close"])
+        return self._output(macd, self.signal.revise(macd))
+
+
+class RSI:
+    def __init__(self, window=RSI_WINDOW):
+        self.gain = RollingMean(window)
+        self.loss = RollingMean(window)
+        self.prev_close = math.nan
+        self.close_before = math.nan
+
+    def _split(self, close, prev_close):
+        if math.isnan(prev_close) or math.isnan(close):
+            return 0.0, 0.0
+        delta = (close / prev_close - 1) * 100
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def _output(self, gain, loss):
+        if loss == 0:
+            return {"RSI": 100.0 if gain > 0 else math.nan}
+        return {"RSI": 100 - 100 / (1 + gain / loss)}
+
+    def update(self, bar):
+        self.close_before = self.prev_close
+        up, down = self._split(bar["Close"], self.prev_close)
+        self.prev_close = bar["Close"]
+        return self._output(self.gain.update(up), self.loss.update(down))
+
+    def revise(self, bar):
+        up, down = self._split(bar["Close"], self.close_before)
+        self.prev_close = bar["Close"]
+        return self._output(self.gain.revise(up), self.loss.revise(down))
+
+
+def make_indicator(indicator: str):
+    """Incremental object for an indicator name used by the views."""
+    if indicator.startswith("SMA_"):
+        return SMA(int(indicator.split("_")[1]))
+    if indicator.startswith("EMA_"):
+        return EMAIndicator(int(indicator.split("_")[1]))
+    if indicator == "ATR":
+        return ATR()
+    if indicator == "MACD":
+        return MACD()
+    if indicator == "RSI":
+        return RSI()
+    raise ValueError(f"Unknown indicator: {indicator}")
+
+
+# ==========================================================
+# INDICATOR SET
+# ==========================================================
+class IndicatorSet:
+    """Incremental indicators for one symbol/interval.
+
+    sync(df) only touches bars after the last one seen: a changed last
+    bar is revised, newer bars are appended. If the history no longer
+    contains the last bar seen (or is older), or the close of the bar
+    before it has changed (a dividend/split back-adjustment or a
+    refetch), the set is rebuilt.
+    """
+
+    OHLC = ["Open", "High", "Low", "Close"]
+
+    def __init__(self, indicators):
+        self.indicators = list(indicators)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.objects = [make_indicator(i) for i in self.indicators]
+        self.last_time = None
+        self.last_bar = None
+        self.frame = None
+        self.anchor = None  # (time, close) of the bar before the last one, to detect revisions
+
+    def columns(self):
+        return [c for i in self.indicators for c in columns_for(i)]
+
+    def _step(self, bar, revise):
+        row = {}
+        for obj in self.objects:
+            row.update(obj.revise(bar) if revise else obj.update(bar))
+        return row
+
+    def push(self, time, bar):
+        """Feed one bar: revise it if it is the last bar seen, else append.
+
+        Returns the indicator values, or None if the bar is unchanged.
+        Does not lock; sync() and single-owner callers only.
+        """
+        if time == self.last_time:
+            if bar == self.last_bar:
+                return None
+            row = self._step(bar, revise=True)
+        else:
+            row = self._step(bar, revise=False)
+        self.last_time, self.last_bar = time, bar
+        return row
+
+    def _history_changed(self, df):
+        """True if the close of the last completed bar seen differs in df.
+
+        A back-adjustment rescales every earlier close, so one O(1)
+        lookup is enough to notice it.
+        """
+        if self.anchor is None:
+            return False
+        time, close = self.anchor
+        if time not in df.index:
+            return True
+        now = df["Close"].iat[df.index.get_loc(time)]
+        return not (now == close or (math.isnan(now) and math.isnan(close)))
+
+    def sync(self, df):
+        """Indicator columns aligned to df.index."""
+        with self.lock:
+            if self.last_time is not None and (self.last_time not in df.index or self._history_changed(df)):
+                self.reset()
+            if self.last_time is None:
+                start = 0
+            else:
+                start = df.index.get_loc(self.last_time)
+            bars = df[self.OHLC].iloc[start:]
+            times = bars.index
+            rows = []
+            for k, bar in enumerate(bars.to_dict("records")):
+                row = self.push(times[k], bar)
+                if row is not None:
+                    rows.append((times[k], row))
+            if rows:
+                new = pd.DataFrame([r for _, r in rows], index=pd.Index([t for t, _ in rows]))
+                if self.frame is None:
+                    self.frame = new
+                else:
+                    frame = self.frame.loc[self.frame.index >= df.index[0]]
+                    frame = frame[~frame.index.isin(new.index)]
+                    self.frame = pd.concat([frame, new])
+                if self.frame.index.name != df.index.name:
+                    self.frame.index.name = df.index.name
+            self.anchor = (df.index[-2], float(df["Close"].iat[-2])) if len(df) > 1 else None
+            if self.frame is None:
+                return pd.DataFrame(index=df.index, columns=self.columns(), dtype=float)
+            return self.frame.reindex(df.index)[self.columns()]
+
+
+@st.cache_resource(max_entries=256)
+def _indicator_set(key, indicators):
+    return IndicatorSet(indicators)
+
+
+def clear_indicator_state():
+    """Drop every shared IndicatorSet (the pages' Refresh buttons)."""
+    _indicator_set.clear()
+
+
+def indicators_for(key, df, indicators):
+    """Add indicator columns to df, reusing the state from earlier reruns.
+
+    key identifies the series (ticker, period, interval); the state is
+    shared by all sessions looking at the same series.
+    """
+    if indicators:
+        state = _indicator_set(key, tuple(indicators))
+        df[state.columns()] = state.sync(df)
+    return df
@@ -0,0 +1,112 @@
+# ==========================================================
+# ratios.py — Vectorized fundamental ratios across a peer set
+# ==========================================================
+#
+# Statements from fundamentals.py are stacked into one array of shape
+# (ticker, period, line item), period 0 being each ticker's latest
+# report. Every ratio in the catalogue is a numerator/denominator pair
+# of line items, so the whole catalogue is a single array division.
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from fundamentals import get_store, load_fundamentals
+
+MARKET_CAP = "Market Cap"
+
+# name -> (numerator line item, denominator line item)
+RATIOS = {
+    "ROE": ("Net Income", "Stockholders Equity"),
+    "ROA": ("Net Income", "Total Assets"),
+    "Debt/Equity": ("Total Debt", "Stockholders Equity"),
+    "Current Ratio": ("Current Assets", "Current Liabilities"),
+    "Gross Margin": ("Gross Profit", "Total Revenue"),
+    "Operating Margin": ("Operating Income", "Total Revenue"),
+    "Net Margin": ("Net Income", "Total Revenue"),
+    "FCF Margin": ("Free Cash Flow", "Total Revenue"),
+    "Asset Turnover": ("Total Revenue", "Total Assets"),
+    "Interest Coverage": ("EBIT", "Interest Expense"),
+    "FCF Yield": ("Free Cash Flow", MARKET_CAP),
+}
+
+
+def stack_statements(frame, tickers, items, frequency="Annual", periods=4, market_caps=None):
+    """Long-format statements to a (ticker, period, item) float array.
+
+    Periods are aligned by recency (0 = latest) because fiscal year ends
+    differ between companies; the matching period_end dates are returned
+    alongside. market_caps ({ticker: value}) fills the Market Cap item.
+    """
+    tickers = list(tickers)
+    items = list(items)
+    cube = np.full((len(tickers), periods, len(items)), np.nan)
+    dates = np.full((len(tickers), periods), np.datetime64("NaT"), dtype="datetime64[ns]")
+
+    rows = frame[(frame["frequency"] == frequency) & frame["line_item"].isin(items) & frame["ticker"].isin(tickers)]
+    if not rows.empty:
+        rank = rows.groupby("ticker")["period_end"].rank(method="dense", ascending=False).astype(int) - 1
+        rows = rows[rank < periods]
+        rank = rank[rank < periods].to_numpy()
+        t = pd.Categorical(rows["ticker"], categories=tickers).codes
+        i = pd.Categorical(rows["line_item"], categories=items).codes
+        cube[t, rank, i] = rows["value"].to_numpy(dtype=float)
+        dates[t, rank] = rows["period_end"].to_numpy(dtype="datetime64[ns]")
+
+    if market_caps and MARKET_CAP in items:
+        caps = np.array([market_caps.get(t, np.nan) for t in tickers], dtype=float)
+        cube[:, :, items.index(MARKET_CAP)] = np.nan
+        cube[:, 0, items.index(MARKET_CAP)] = caps  # market cap is current, only set for the latest period
+    return cube, dates
+
+
+def compute_ratio_cube(cube, items, catalogue=RATIOS):
+    """All ratios in one pass: returns an array (ratio, ticker, period)."""
+    index = {item: k for k, item in enumerate(items)}
+    num = cube[:, :, [index[n] for n, _ in catalogue.values()]]
+    den = cube[:, :, [index[d] for _, d in catalogue.values()]]
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=(den != 0) & ~np.isnan(den))
+    return np.moveaxis(out, 2, 0)
+
+
+def catalogue_items(catalogue=RATIOS):
+    return sorted({item for pair in catalogue.values() for item in pair})
+
+
+@st.cache_data(ttl=3600)
+def _ratios(tickers, frequency, periods, market_caps, versions, catalogue):
+    # versions (store data versions) only key the cache: new statements, new entry
+    frame, _ = load_fundamentals(list(tickers))
+    catalogue = dict(catalogue)
+    items = catalogue_items(catalogue)
+    cube, dates = stack_statements(frame, tickers, items, frequency, periods, dict(market_caps))
+    return compute_ratio_cube(cube, items, catalogue), dates
+
+
+def compute_ratios(tickers, frequency="Annual", periods=4, market_caps=None, catalogue=RATIOS):
+    """Ratio array (ratio, ticker, period) and period dates (ticker, period).
+
+    Cached per data version of every ticker in the fundamentals store.
+    """
+    tickers = tuple(tickers)
+    store = get_store()
+    versions = tuple(store.version(t) for t in tickers)
+    return _ratios(
+        tickers, frequency, periods,
+        tuple(sorted((market_caps or {}).items())),
+        versions,
+        tuple(catalogue.items()),
+    )
+
+
+def ratio_table(ratios, tickers, period=0, catalogue=RATIOS):
+    """Ticker x ratio table for one period (0 = latest)."""
+    return pd.DataFrame(ratios[:, :, period].T, index=list(tickers), columns=list(catalogue))
+
+
+def rank_by(ratios, tickers, ratio, period=0, ascending=False, catalogue=RATIOS):
+    """Tickers sorted by one ratio, NaN last."""
+    values = ratios[list(catalogue).index(ratio), :, period]
+    order = np.argsort(-values if not ascending else values, kind="stable")
+    order = np.concatenate([order[~np.isnan(values[order])], order[np.isnan(values[order])]])
+    return pd.Series(values[order], index=np.asarray(tickers)[order], name=ratio)
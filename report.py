@@ -0,0 +1,238 @@
+# ==========================================================
+# report.py — Batch reports over the page pipelines
+# ==========================================================
+#
+# Runs fetch -> indicators -> figures for a list of symbols in a process
+# pool and writes static outputs, one set per symbol:
+#
+#   python report.py RELIANCE.NS TCS.NS --indicators SMA_50,RSI --png
+#   python report.py --fno --out reports/eod --workers 8
+#   python report.py USD/INR EUR/INR --kind forex
+#   python report.py --file watchlist.txt --kind financials
+#
+# <out>/<symbol>.html   chart(s) and latest rows, like the page shows them
+# <out>/<symbol>.png    chart image (--png, needs kaleido)
+# <out>/<symbol>.parquet the data behind the chart
+# <out>/index.html      links to every report
+#
+# Each finished symbol writes <out>/.done/<symbol>.json; a rerun with
+# the same options skips those, so an interrupted run resumes.
+
+import os
+import sys
+import json
+import time
+import html
+import hashlib
+import argparse
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from plotly.offline import get_plotlyjs
+from functions import (
+    fetch_fno_list, fetch_history, plot_balance, plot_candles_stick_bar, plot_cash, plot_income,
+)
+from indicators import add_indicators
+from crossrates import cross_rate
+from fundamentals import FREQUENCIES, STATEMENTS, fetch_statements, statement_table
+from resilience import BULK, get_scheduler, priority
+
+KINDS = ["price", "forex", "commodity", "financials"]
+TABLE_ROWS = 20
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<script src="plotly.min.js"></script>
+<style>body {{font-family: sans-serif; margin: 2rem}} table {{border-collapse: collapse; font-size: 0.85rem}}
+td, th {{border: 1px solid #ddd; padding: 0.2rem 0.5rem; text-align: right}}</style>
+</head><body><h1>{title}</h1>
+{body}
+</body></html>
+"""
+
+
+def _filename(symbol):
+    return "".join(c if c.isalnum() or c in "-_.=^" else "_" for c in symbol)
+
+
+# ==========================================================
+# PIPELINES (run in the workers)
+# ==========================================================
+def price_pipeline(symbol, options):
+    """History with indicators and the candlestick chart of the price pages."""
+    if options["kind"] == "forex":
+        base, quote = symbol.split("/")
+        hist = cross_rate(base, quote, period=options["period"], interval=options["interval"])
+    else:
+        hist = fetch_history(symbol, period=options["period"], interval=options["interval"])
+    if isinstance(hist, Exception):
+        raise hist
+    df = hist.copy(deep=False)
+    if "Volume" in df and not df["Volume"].any():
+        df = df.drop(columns=["Volume"])  # indices and FX report no volume
+    df = add_indicators(df, options["indicators"])
+    fig = plot_candles_stick_bar(df, title=f"{symbol} ({options['period']}, {options['interval']})")
+    return df, [fig], [("Latest bars", df.tail(TABLE_ROWS).iloc[::-1])]
+
+
+def financials_pipeline(symbol, options):
+    """Statement charts and tables of the Financials page."""
+    frame = fetch_statements(symbol)
+    if isinstance(frame, Exception):
+        raise frame
+    frequency = options["frequency"]
+    figures, tables = [], []
+    for statement, plot in zip(STATEMENTS, [plot_balance, plot_income, plot_cash]):
+        table = statement_table(frame, symbol, statement, frequency)
+        if table.empty:
+            continue
+        tables.append((statement, table))
+        figures.append(plot(table.copy(), ticker=symbol))
+    return frame, figures, tables
+
+
+PIPELINES = {
+    "price": price_pipeline,
+    "forex": price_pipeline,
+    "commodity": price_pipeline,
+    "financials": financials_pipeline,
+}
+
+
+def init_worker(workers):
+    """Each worker process gets an equal share of the upstream budget."""
+    get_scheduler().scale(1 / workers)
+
+
+def run_symbol(symbol, options):
+    """Worker: run one symbol's pipeline and write its outputs."""
+    start = time.perf_counter()
+    out = options["out"]
+    name = _filename(symbol)
+    with priority(BULK):
+        data, figures, tables = PIPELINES[options["kind"]](symbol, options)
+
+    data.to_parquet(os.path.join(out, f"{name}.parquet"))
+    body = [fig.to_html(full_html=False, include_plotlyjs=False) for fig in figures]
+    body += [f"<h2>{caption}</h2>" + table.to_html(float_format="{:,.2f}".format, na_rep="—")
+             for caption, table in tables]
+    with open(os.path.join(out, f"{name}.html"), "w") as f:
+        f.write(PAGE.format(title=html.escape(symbol), body="\n".join(body)))
+    if options["png"] and figures:
+        figures[0].write_image(os.path.join(out, f"{name}.png"), width=1400, height=900)
+
+    seconds = time.perf_counter() - start
+    with open(os.path.join(out, ".done", f"{name}.json"), "w") as f:
+        json.dump({"symbol": symbol, "options": options["key"], "seconds": seconds}, f)
+    return seconds
+
+
+# ==========================================================
+# DRIVER
+# ==========================================================
+def options_key(options):
+    """Hash of the options that change the outputs, to tell stale markers apart."""
+    relevant = {k: options[k] for k in ["kind", "period", "interval", "indicators", "frequency", "png"]}
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def is_done(symbol, options):
+    try:
+        with open(os.path.join(options["out"], ".done", f"{_filename(symbol)}.json")) as f:
+            return json.load(f)["options"] == options["key"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return False
+
+
+def write_index(symbols, options, failed):
+    links = []
+    for symbol in symbols:
+        if symbol in failed:
+            links.append(f"<li>{html.escape(symbol)}: {html.escape(failed[symbol])}</li>")
+        else:
+            links.append(f'<li><a href="{_filename(symbol)}.html">{html.escape(symbol)}</a></li>')
+    with open(os.path.join(options["out"], "index.html"), "w") as f:
+        f.write(PAGE.format(title=f"Report — {options['kind']}", body="<ul>" + "\n".join(links) + "</ul>"))
+
+
+def run(symbols, options, workers=None, log=print):
+    """Generate reports for symbols; returns {symbol: error message} for failures."""
+    out = options["out"]
+    os.makedirs(os.path.join(out, ".done"), exist_ok=True)
+    options["key"] = options_key(options)
+    with open(os.path.join(out, "plotly.min.js"), "w") as f:
+        f.write(get_plotlyjs())
+
+    todo = [s for s in symbols if not is_done(s, options)]
+    if len(todo) < len(symbols):
+        log(f"Resuming: {len(symbols) - len(todo)} of {len(symbols)} symbols already done")
+
+    failed = {}
+    start = time.perf_counter()
+    workers = workers or os.cpu_count()
+    # spawned, not forked: the cache's sweeper and data-loop threads do not survive a fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(workers,)) as pool:
+        futures = {pool.submit(run_symbol, symbol, options): symbol for symbol in todo}
+        for k, future in enumerate(as_completed(futures), start=1):
+            symbol = futures[future]
+            try:
+                seconds = future.result()
+                status = f"ok ({seconds:.1f}s)"
+            except Exception as e:
+                failed[symbol] = str(e) or type(e).__name__
+                status = f"FAILED: {failed[symbol]}"
+            elapsed = time.perf_counter() - start
+            eta = elapsed / k * (len(todo) - k)
+            log(f"[{k}/{len(todo)}] {symbol}: {status} — elapsed {elapsed:.0f}s, eta {eta:.0f}s")
+
+    write_index(symbols, options, failed)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch reports over the dashboard's page pipelines")
+    parser.add_argument("symbols", nargs="*", help="symbols (BASE/QUOTE pairs for --kind forex)")
+    parser.add_argument("--file", help="file with one symbol per line")
+    parser.add_argument("--fno", action="store_true", help="the whole NSE F&O list")
+    parser.add_argument("--kind", choices=KINDS, default="price")
+    parser.add_argument("--period", default="1y")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--indicators", default="", help="comma-separated, e.g. SMA_50,RSI,MACD")
+    parser.add_argument("--frequency", choices=FREQUENCIES, default="Annual")
+    parser.add_argument("--png", action="store_true", help="also write PNG charts (needs kaleido)")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    symbols = list(args.symbols)
+    if args.file:
+        with open(args.file) as f:
+            symbols += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if args.fno:
+        symbols += fetch_fno_list()
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        parser.error("no symbols given")
+    if args.kind == "forex" and any("/" not in s for s in symbols):
+        parser.error("--kind forex expects BASE/QUOTE pairs, e.g. USD/INR")
+    if args.png and importlib.util.find_spec("kaleido") is None:
+        parser.error("--png needs the kaleido package (pip install kaleido)")
+
+    options = {
+        "kind": args.kind,
+        "period": args.period,
+        "interval": args.interval,
+        "indicators": [i.strip() for i in args.indicators.split(",") if i.strip()],
+        "frequency": args.frequency,
+        "png": args.png,
+        "out": args.out,
+    }
+    failed = run(symbols, options, workers=args.workers)
+    print(f"Done: {len(symbols) - len(failed)} of {len(symbols)} symbols; index at {os.path.join(args.out, 'index.html')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+# ==========================================================
+# resilience.py — Typed fetch errors, negative cache, breakers
+# ==========================================================
+#
+# The fetch_* functions raise inside their caches, so st.cache_data
+# never stores a failure. @returns_errors turns the exception into a
+# typed FetchError for the views and remembers invalid symbols for a
+# few minutes; @circuit fails fast while an upstream endpoint is down
+# and takes every upstream call through the rate budget of the
+# UpstreamScheduler.
+
+import os
+import time
+import itertools
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from shared_cache import cache_key
+
+NEGATIVE_TTL = 300       # seconds an invalid symbol is remembered
+FAILURE_THRESHOLD = 5    # consecutive upstream failures before opening
+OPEN_SECONDS = 60        # how long an open breaker fails fast
+
+
+class FetchError(Exception):
+    """Base class for the errors returned by the fetch_* functions."""
+
+
+class InvalidSymbol(FetchError):
+    """The symbol exists nowhere upstream or has no data of this kind."""
+
+
+class UpstreamUnavailable(FetchError):
+    """The upstream endpoint failed or its circuit breaker is open."""
+
+
+class Overloaded(UpstreamUnavailable):
+    """Shed by the upstream scheduler: the call would wait too long."""
+
+
+# ==========================================================
+# CIRCUIT BREAKER
+# ==========================================================
+class CircuitBreaker:
+    """Closed → open after repeated failures → half-open after a pause.
+
+    While half-open a single trial call goes through; its outcome
+    closes or re-opens the breaker.
+    """
+
+    def __init__(self, name, threshold=FAILURE_THRESHOLD, open_seconds=OPEN_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.open_seconds:
+            return "half-open"
+        return "open"
+
+    def retry_in(self):
+        if self.opened_at is None:
+            return 0
+        return max(0, int(self.open_seconds - (time.monotonic() - self.opened_at)))
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a trial allowed by allow() that never ran."""
+        with self.lock:
+            self.trial = False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial = False
+
+
+breakers = {}
+
+
+def get_breaker(endpoint):
+    if endpoint not in breakers:
+        breakers[endpoint] = CircuitBreaker(endpoint)
+    return breakers[endpoint]
+
+
+def circuit(endpoint, cost=1):
+    """Guard the raw upstream call of a fetch_* function.
+
+    Goes innermost, below the caches, so cached data is still served
+    while the breaker is open. InvalidSymbol does not count as a failure.
+    A call the breaker lets through then takes cost tokens from the
+    UpstreamScheduler (one per upstream request it makes; cost may be a
+    function of the call's arguments); a shed call raises Overloaded
+    without counting as a failure.
+    """
+    breaker = get_breaker(endpoint)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not breaker.allow():
+                raise UpstreamUnavailable(
+                    f"Yahoo Finance ({endpoint}) is unavailable, retrying in {breaker.retry_in()}s"
+                )
+            try:
+                get_scheduler().acquire(cost=cost(*args, **kwargs) if callable(cost) else cost)
+            except Overloaded:
+                breaker.release()
+                raise
+            try:
+                value = func(*args, **kwargs)
+            except InvalidSymbol:
+                breaker.success()
+                raise
+            except Exception as e:
+                breaker.failure()
+                raise UpstreamUnavailable(f"Yahoo Finance ({endpoint}) error: {e}") from e
+            breaker.success()
+            return value
+        return wrapper
+    return decorator
+
+
+# ==========================================================
+# UPSTREAM SCHEDULER
+# ==========================================================
+UPSTREAM_RATE = float(os.environ.get("YFD_UPSTREAM_RATE", 4))     # calls per second
+UPSTREAM_BURST = float(os.environ.get("YFD_UPSTREAM_BURST", 20))  # bucket size
+
+INTERACTIVE, PREFETCH, BULK = 0, 1, 2
+PRIORITIES = {INTERACTIVE: "interactive", PREFETCH: "prefetch", BULK: "bulk"}
+
+# longest expected wait for a token before a call is shed (None: never)
+MAX_WAIT = {INTERACTIVE: 8.0, PREFETCH: 4.0, BULK: None}
+# tokens a class leaves in the bucket for the classes above it
+RESERVE = {INTERACTIVE: 0, PREFETCH: 2, BULK: 5}
+
+WAIT_SAMPLES = 1000
+
+
+class Ticket:
+    """Priority of one unit of work; boosting it reorders its queued calls."""
+
+    def __init__(self, level=INTERACTIVE):
+        self.level = level
+
+
+_current = threading.local()
+
+
+@contextmanager
+def priority(level):
+    """Run this thread's upstream calls at level (or under a Ticket)."""
+    ticket = level if isinstance(level, Ticket) else Ticket(level)
+    previous = getattr(_current, "ticket", None)
+    _current.ticket = ticket
+    try:
+        yield ticket
+    finally:
+        _current.ticket = previous
+
+
+def current_ticket():
+    """Ticket of the running work; page renders default to INTERACTIVE."""
+    return getattr(_current, "ticket", None) or Ticket(INTERACTIVE)
+
+
+class UpstreamScheduler:
+    """Token bucket shared by every upstream call, served by priority.
+
+    Each upstream request takes one token (a call making n requests
+    takes n at once); the bucket refills at rate up to burst.
+    Waiting calls are served by priority class, then arrival order, and
+    a class never takes the last RESERVE[class] tokens, so a bulk refresh
+    leaves headroom for page renders. A call whose expected wait exceeds
+    MAX_WAIT[class] is shed with Overloaded, and returns_errors falls
+    back to the expired cached copy when there is one.
+    """
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.waiting = []  # [(seq, ticket)]
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.counts = {name: {"granted": 0, "shed": 0} for name in PRIORITIES.values()}
+        self.waits = {name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITIES.values()}
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, ticket=None, cost=1):
+        """Block until cost tokens are granted to ticket (default: this thread's).
+
+        A cost above burst waits for a full bucket and leaves the rest as
+        debt, which later calls wait out.
+        """
+        ticket = ticket or current_ticket()
+        start = time.monotonic()
+        with self.cond:
+            entry = (next(self.seq), ticket)
+            self.waiting.append(entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    level = ticket.level
+                    ahead = sum(1 for seq, t in self.waiting if (t.level, seq) < (level, entry[0]))
+                    need = min(cost, self.burst)
+                    reserve = min(RESERVE[level], self.burst - need)  # a small bucket still serves every class
+                    missing = ahead + need + reserve - self.tokens
+                    if missing <= 0:
+                        self.tokens -= cost
+                        self.counts[PRIORITIES[level]]["granted"] += 1
+                        self.waits[PRIORITIES[level]].append(now - start)
+                        return
+                    wait = missing / self.rate
+                    limit = MAX_WAIT[level]
+                    if limit is not None and now - start + wait > limit:
+                        self.counts[PRIORITIES[level]]["shed"] += 1
+                        raise Overloaded(
+                            f"Yahoo Finance request budget exhausted ({PRIORITIES[level]} call shed)"
+                        )
+                    self.cond.wait(min(wait, 1.0))
+            finally:
+                self.waiting.remove(entry)
+                self.cond.notify_all()
+
+    def boost(self, ticket, level):
+        """Raise ticket to level (a page now waits on bulk work)."""
+        with self.cond:
+            if level < ticket.level:
+                ticket.level = level
+                self.cond.notify_all()
+
+    def scale(self, fraction):
+        """Keep only a share of the budget (one of several processes)."""
+        with self.cond:
+            self.rate *= fraction
+            self.burst = max(1.0, self.burst * fraction)
+            self.tokens = min(self.tokens, self.burst)
+
+    def metrics(self):
+        """Tokens, queue depth, grants, sheds and waits per priority class."""
+        with self.cond:
+            self._refill(time.monotonic())
+            waiting = [PRIORITIES[t.level] for _, t in self.waiting]
+            result = {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 2)}
+            for name in PRIORITIES.values():
+                waits = sorted(self.waits[name])
+                result[name] = {
+                    **self.counts[name],
+                    "waiting": waiting.count(name),
+                    "wait_ms_p50": waits[len(waits) // 2] * 1000 if waits else None,
+                    "wait_ms_p95": waits[min(int(0.95 * len(waits)), len(waits) - 1)] * 1000 if waits else None,
+                }
+        return result
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide UpstreamScheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = UpstreamScheduler()
+        return _scheduler
+
+
+# ==========================================================
+# NEGATIVE CACHE
+# ==========================================================
+def returns_errors(negative_ttl=NEGATIVE_TTL):
+    """Return FetchError instances instead of raising.
+
+    Goes outermost. InvalidSymbol results are kept for negative_ttl
+    seconds so a bad ticker is not retried on every rerun. A call shed
+    by the scheduler returns the underlying cache's stale() copy if it
+    has one. The wrapper's clear() drops those entries as well as the
+    underlying cache.
+    """
+    def decorator(func):
+        negative = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache_key(func.__name__, func, args, kwargs)
+            with lock:
+                entry = negative.get(key)
+                if entry is not None and entry[1] > time.monotonic():
+                    return entry[0]
+                negative.pop(key, None)
+            try:
+                return func(*args, **kwargs)
+            except InvalidSymbol as e:
+                with lock:
+                    negative[key] = (e, time.monotonic() + negative_ttl)
+                return e
+            except Overloaded as e:
+                stale = getattr(func, "stale", None)
+                value = stale(*args, **kwargs) if stale else None
+                return e if value is None else value
+            except FetchError as e:
+                return e
+            except Exception as e:
+                return UpstreamUnavailable(str(e))
+
+        def clear(*args, **kwargs):
+            with lock:
+                if args or kwargs:
+                    negative.pop(cache_key(func.__name__, func, args, kwargs), None)
+                else:
+                    negative.clear()
+            func.clear(*args, **kwargs)
+
+        wrapper.clear = clear
+        return wrapper
+    return decorator
@@ -0,0 +1,623 @@
+# ==========================================================
+# shared_cache.py — Cache shared across replicas/processes
+# ==========================================================
+#
+# st.cache_data lives inside one process. The backends below sit
+# underneath it so that replicas and workers reuse each other's
+# downloads. Payloads are stored as Arrow IPC files: a hit on the
+# file backend is a memory map, a hit on a KV store is a buffer read.
+#
+# Configure with the YFD_SHARED_CACHE environment variable:
+#   file:///var/cache/yfd     same-host workers
+#   redis://host:6379/0       network KV (needs the redis package)
+#   memory://                 in-process stand-in for the KV backend
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import tempfile
+import weakref
+import functools
+import threading
+from collections import OrderedDict, deque
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CACHE_URL_ENV = "YFD_SHARED_CACHE"
+COLD_AFTER_ENV = "YFD_COLD_AFTER"
+COLD_CODEC_ENV = "YFD_COLD_CODEC"
+
+_KIND = b"yfd_kind"
+_EXPIRES = b"yfd_expires"
+
+
+# ==========================================================
+# SERIALIZATION (Arrow IPC)
+# ==========================================================
+def to_table(value, expires):
+    """Wrap a fetch_* result in an Arrow table."""
+    if isinstance(value, pd.DataFrame):
+        table = frame_to_table(value)
+        kind = b"frame"
+    elif isinstance(value, list):
+        table = pa.table({"value": value})
+        kind = b"list"
+    else:
+        table = pa.table({"json": [json.dumps(value, default=str)]})
+        kind = b"json"
+    metadata = dict(table.schema.metadata or {})
+    metadata[_KIND] = kind
+    metadata[_EXPIRES] = str(expires).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def frame_to_table(df):
+    """DataFrame to Arrow, keeping NaN as a value rather than a null.
+
+    Arrow columns with nulls cannot be handed to pandas without a copy;
+    float columns that only hold NaN gaps (typical for OHLCV) can.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type) and table.column(i).null_count:
+            column = table.column(i).combine_chunks().fill_null(np.nan)
+            table = table.set_column(i, field, column)
+    return table
+
+
+def from_table(table):
+    """Inverse of to_table.
+
+    Frames are built with one block per column, so null-free numeric
+    columns are read-only views of the Arrow buffers (for the file
+    backend, of the memory-mapped file) instead of copies.
+    """
+    kind = table.schema.metadata[_KIND]
+    if kind == b"frame":
+        return table.to_pandas(split_blocks=True)
+    if kind == b"list":
+        return table.column("value").to_pylist()
+    return json.loads(table.column("json")[0].as_py())
+
+
+def is_expired(schema):
+    return float(schema.metadata[_EXPIRES]) < time.time()
+
+
+def serialize(value, ttl, compression=None):
+    """Arrow IPC file bytes for value, expiring ttl seconds from now.
+
+    compression ("zstd" or "lz4") compresses the column buffers; readers
+    inflate them transparently.
+    """
+    table = to_table(value, time.time() + ttl)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def deserialize(buffer, allow_expired=False):
+    """Read an Arrow IPC file buffer; None if it has expired."""
+    reader = pa.ipc.open_file(pa.BufferReader(buffer))
+    if not allow_expired and is_expired(reader.schema):
+        return None
+    return from_table(reader.read_all())
+
+
+# ==========================================================
+# BACKENDS
+# ==========================================================
+class FileBackend:
+    """Arrow IPC files in a directory shared by same-host workers."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.arrow")
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            source = pa.memory_map(path, "r")
+        except FileNotFoundError:
+            return None
+        reader = pa.ipc.open_file(source)
+        if is_expired(reader.schema):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        return from_table(reader.read_all())
+
+    def set(self, key, value, ttl):
+        buffer = serialize(value, ttl)
+        # Write then rename so readers never map a half-written file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(buffer)
+        os.replace(tmp, self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self, prefix=""):
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".arrow"):
+                os.remove(os.path.join(self.directory, name))
+
+
+class KVBackend:
+    """Network key-value store with a redis-style get/set(ex=) client."""
+
+    def __init__(self, client, prefix="yfd:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            return None
+        return deserialize(pa.py_buffer(data))
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, serialize(value, ttl).to_pybytes(), ex=int(ttl))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self, prefix=""):
+        for key in self.client.scan_iter(self.prefix + prefix + "*"):
+            self.client.delete(key)
+
+
+class MemoryKV:
+    """In-process stand-in for a redis client (get/set/delete/scan_iter)."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.time():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self.data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def scan_iter(self, pattern="*"):
+        prefix = pattern.rstrip("*")
+        with self.lock:
+            return [k for k in self.data if k.startswith(prefix)]
+
+
+def backend_from_url(url):
+    """Build a backend from a file://, redis:// or memory:// URL."""
+    if url.startswith("file://"):
+        return FileBackend(url[len("file://"):])
+    if url.startswith(("redis://", "rediss://")):
+        import redis
+        return KVBackend(redis.Redis.from_url(url))
+    if url.startswith("memory://"):
+        return KVBackend(MemoryKV())
+    raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+_backend = None
+_configured = False
+
+
+def get_backend():
+    """Backend configured by YFD_SHARED_CACHE, or None when unset."""
+    global _backend, _configured
+    if not _configured:
+        url = os.environ.get(CACHE_URL_ENV)
+        _backend = backend_from_url(url) if url else None
+        _configured = True
+    return _backend
+
+
+def set_backend(backend):
+    """Override the configured backend (None disables sharing)."""
+    global _backend, _configured
+    _backend = backend
+    _configured = True
+
+
+# ==========================================================
+# DECORATOR
+# ==========================================================
+def cache_key(name, func, args, kwargs):
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    raw = repr((name, sorted(bound.arguments.items())))
+    return f"{name}-{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def shared(ttl):
+    """Look results up in the shared backend before calling func.
+
+    Goes underneath @st.cache_data. Exceptions returned by the fetch_*
+    functions are passed through and never shared, and a failing backend
+    just falls back to calling func. The wrapper's clear() deletes one
+    call's key, or all of func's keys, from the backend.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return func(*args, **kwargs)
+            key = cache_key(func.__name__, func, args, kwargs)
+            try:
+                value = backend.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                return value
+            value = func(*args, **kwargs)
+            if not isinstance(value, Exception):
+                try:
+                    backend.set(key, value, ttl)
+                except Exception:
+                    return value
+                if isinstance(backend, FileBackend):
+                    # Hand out the mapped copy and let the heap copy go
+                    mapped = backend.get(key)
+                    if mapped is not None:
+                        return mapped
+            return value
+
+        def clear(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return
+            try:
+                if args or kwargs:
+                    backend.delete(cache_key(func.__name__, func, args, kwargs))
+                else:
+                    backend.clear(f"{func.__name__}-")
+            except Exception:
+                pass
+
+        wrapper.clear = clear
+        return wrapper
+    return decorator
+
+
+# ==========================================================
+# PROCESS-WIDE SHARED VALUES
+# ==========================================================
+PROCESS_CACHE_ENTRIES = 512
+
+
+class FrozenDict(dict):
+    """dict that refuses in-place changes (still JSON/pickle friendly)."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Shared cached value is read-only; copy it with dict(value)")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+
+def freeze(value):
+    """Make a cached value safe to hand to every session as is.
+
+    Frames get read-only column arrays, so writes through .values or
+    .to_numpy() raise. With pandas copy-on-write (enabled in functions.py)
+    every pandas-level write copies the touched columns first; a shallow
+    copy can take new columns or replaced values without touching the
+    shared arrays. Dicts become FrozenDicts.
+    """
+    if isinstance(value, pd.DataFrame):
+        for block in value._mgr.blocks:
+            if isinstance(block.values, np.ndarray):
+                block.values.flags.writeable = False
+        if isinstance(value.index.values, np.ndarray):
+            value.index.values.flags.writeable = False
+        return value
+    if isinstance(value, dict) and not isinstance(value, FrozenDict):
+        return FrozenDict(value)
+    return value
+
+
+# ==========================================================
+# HOT/COLD TIERS
+# ==========================================================
+# A hot entry is the frozen value itself. Once nobody has asked for it
+# for COLD_AFTER seconds it is demoted to a compressed Arrow IPC buffer
+# (the serialize() format above) and inflated again on its next hit.
+# Only frames and lists of at least COLD_MIN_BYTES are demoted; info
+# dicts and small tables compress to next to nothing saved. Expired
+# entries are kept STALE_SECONDS longer for stale() (load shedding).
+COLD_AFTER = float(os.environ.get(COLD_AFTER_ENV, 600))
+COLD_MIN_BYTES = 64 * 1024
+STALE_SECONDS = 3600
+SWEEP_SECONDS = 30
+LATENCY_SAMPLES = 1000
+
+
+def cold_codec():
+    """YFD_COLD_CODEC (default zstd) if pyarrow has it, else lz4, else None."""
+    for codec in [os.environ.get(COLD_CODEC_ENV, "zstd"), "zstd", "lz4"]:
+        if pa.Codec.is_available(codec):
+            return codec
+    return None
+
+
+def nbytes(value):
+    """In-memory size of a demotable value, 0 for anything else."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, list):
+        return sum(len(str(v)) + 49 for v in value) + 8 * len(value) + 56
+    return 0
+
+
+_COLD = object()  # sentinel: entry missing or compressed
+
+
+class _Entry:
+    __slots__ = ("value", "blob", "expires", "used", "raw", "pinned")
+
+    def __init__(self, value, expires):
+        self.value = value
+        self.blob = None  # compressed IPC buffer while cold
+        self.expires = expires
+        self.used = time.time()
+        self.raw = nbytes(value)
+        self.pinned = False  # could not be serialized; stays hot
+
+
+class TieredCache:
+    """Process-wide cache of one fetch_* function with hot and cold tiers.
+
+    Keys are cache_key() of the call. Entries expire ttl seconds after
+    the fetch whichever tier they are in, but stay readable through
+    stale() for STALE_SECONDS more; beyond max_entries the least
+    recently used one is dropped. Concurrent misses on a key wait for
+    the first caller instead of fetching again.
+    """
+
+    def __init__(self, func, ttl, cold_after=COLD_AFTER, codec=None, max_entries=PROCESS_CACHE_ENTRIES):
+        self.func = func
+        self.name = func.__name__
+        self.ttl = ttl
+        self.cold_after = cold_after
+        self.codec = codec or cold_codec()
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.counts = {"hot_hits": 0, "cold_hits": 0, "stale_hits": 0, "misses": 0, "demotions": 0}
+        self.promote_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self.demote_seconds = deque(maxlen=LATENCY_SAMPLES)
+        _caches.add(self)
+        _start_sweeper()
+
+    def __call__(self, *args, **kwargs):
+        key = cache_key(self.name, self.func, args, kwargs)
+        value = self._hot(self._entry(key))
+        if value is not _COLD:
+            return value
+        try:
+            with self._key_lock(key):
+                entry = self._entry(key)  # filled or promoted while we waited
+                value = self._hot(entry)
+                if value is _COLD and entry is not None:
+                    value = self._promote(entry)
+                if value is _COLD:
+                    value = freeze(self.func(*args, **kwargs))
+                    self._store(key, value)
+                return value
+        finally:
+            with self.lock:
+                self.loading.pop(key, None)
+
+    def _entry(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.expires < time.time():
+                return None  # expired entries are left for stale()
+            self.entries.move_to_end(key)
+            return entry
+
+    def _key_lock(self, key):
+        with self.lock:
+            return self.loading.setdefault(key, threading.Lock())
+
+    def _hot(self, entry):
+        """The entry's value if it is hot, else _COLD."""
+        with self.lock:
+            if entry is None or entry.blob is not None:
+                return _COLD
+            entry.used = time.time()
+            self.counts["hot_hits"] += 1
+            return entry.value
+
+    def _promote(self, entry):
+        start = time.perf_counter()
+        value = deserialize(entry.blob)
+        if value is None:
+            return _COLD  # expired in the meantime
+        value = freeze(value)
+        seconds = time.perf_counter() - start
+        with self.lock:
+            entry.value, entry.blob, entry.used = value, None, time.time()
+            self.counts["cold_hits"] += 1
+            self.promote_seconds.append(seconds)
+        return value
+
+    def _store(self, key, value):
+        with self.lock:
+            self.counts["misses"] += 1
+            self.entries[key] = _Entry(value, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def sweep(self, now=None):
+        """Drop expired entries and demote idle ones to the cold tier.
+
+        With the file backend hot frames are views of memory-mapped files
+        the OS can already reclaim, so nothing is demoted.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            for key in [k for k, e in self.entries.items() if e.expires + STALE_SECONDS < now]:
+                del self.entries[key]
+            if self.codec is None or isinstance(get_backend(), FileBackend):
+                return
+            idle = [
+                (key, entry) for key, entry in self.entries.items()
+                if entry.blob is None and not entry.pinned
+                and entry.raw >= COLD_MIN_BYTES and now - entry.used >= self.cold_after
+            ]
+        for key, entry in idle:
+            used, start = entry.used, time.perf_counter()
+            try:
+                blob = serialize(entry.value, entry.expires - now, self.codec)
+            except Exception:
+                entry.pinned = True
+                continue
+            seconds = time.perf_counter() - start
+            with self.lock:
+                # a hit during compression keeps the entry hot
+                if self.entries.get(key) is entry and entry.used == used and entry.blob is None:
+                    entry.value, entry.blob = None, blob
+                    self.counts["demotions"] += 1
+                    self.demote_seconds.append(seconds)
+
+    def stale(self, *args, **kwargs):
+        """Last value of the call even if expired (None past STALE_SECONDS)."""
+        key = cache_key(self.name, self.func, args, kwargs)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.expires + STALE_SECONDS < time.time():
+                return None
+            value, blob = entry.value, entry.blob
+            self.counts["stale_hits"] += 1
+        if blob is not None:
+            value = freeze(deserialize(blob, allow_expired=True))
+        return value
+
+    def clear(self, *args, **kwargs):
+        """Drop one call's entry, or all of them when called without arguments."""
+        with self.lock:
+            if args or kwargs:
+                self.entries.pop(cache_key(self.name, self.func, args, kwargs), None)
+            else:
+                self.entries.clear()
+
+    def metrics(self):
+        """Tier sizes, hit counts, compression ratio and promote latency."""
+        with self.lock:
+            entries = list(self.entries.values())
+            promote = sorted(self.promote_seconds)
+            demote = sorted(self.demote_seconds)
+            counts = dict(self.counts)
+        cold = [e for e in entries if e.blob is not None]
+        raw = sum(e.raw for e in cold)
+        compressed = sum(e.blob.size for e in cold)
+        return {
+            **counts,
+            "codec": self.codec,
+            "hot_entries": len(entries) - len(cold),
+            "cold_entries": len(cold),
+            "hot_bytes": sum(e.raw for e in entries if e.blob is None),
+            "cold_raw_bytes": raw,
+            "cold_bytes": compressed,
+            "compression_ratio": raw / compressed if compressed else None,
+            "promote_ms_p50": _percentile(promote, 0.50),
+            "promote_ms_p95": _percentile(promote, 0.95),
+            "promote_ms_max": _percentile(promote, 1.0),
+            "demote_ms_p50": _percentile(demote, 0.50),
+        }
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    return samples[min(int(q * len(samples)), len(samples) - 1)] * 1000
+
+
+_caches = weakref.WeakSet()
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def _start_sweeper():
+    """One daemon thread sweeps every TieredCache each SWEEP_SECONDS."""
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(SWEEP_SECONDS)
+                for cache in list(_caches):
+                    try:
+                        cache.sweep()
+                    except Exception:
+                        pass
+
+        _sweeper = threading.Thread(target=loop, name="yfd-cache-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def tier_metrics():
+    """{function name: TieredCache.metrics()} for every process cache."""
+    return {cache.name: cache.metrics() for cache in list(_caches)}
+
+
+def process_cache(ttl, cold_after=COLD_AFTER):
+    """In-process cache to put above @shared: one frozen instance per key.
+
+    st.cache_data unpickles a private copy on every hit, so N sessions
+    on the same symbol held N copies (and undid the page sharing of the
+    file backend). This hands every session the same object, frozen by
+    freeze(); sessions take df.copy(deep=False) and add their own derived
+    columns on top. Idle entries move to the compressed cold tier.
+    """
+    def decorator(func):
+        cache = TieredCache(func, ttl, cold_after=cold_after)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache(*args, **kwargs)
+
+        def clear(*args, **kwargs):
+            # the shared layer underneath first, so a concurrent miss
+            # cannot refill this one from it
+            if hasattr(func, "clear"):
+                func.clear(*args, **kwargs)
+            cache.clear(*args, **kwargs)
+
+        wrapper.clear = clear
+        wrapper.stale = cache.stale
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -0,0 +1,212 @@
+# ==========================================================
+# streaming.py — Live quotes shared by every session
+# ==========================================================
+#
+# One QuoteHub per process holds a single upstream subscription per
+# symbol and keeps the latest tick in memory. Sessions never subscribe
+# upstream themselves: their live tiles are fragments that re-read the
+# hub every few seconds, so the work done per tick is one dict update
+# (plus any server-side listeners) whatever the number of viewers.
+
+import json
+import time
+import threading
+from collections import defaultdict
+import streamlit as st
+import yfinance as yf
+
+LIVE_REFRESH_SECONDS = 2   # how often a live tile re-reads the hub
+LEASE_SECONDS = 60         # symbols nobody watched for this long are dropped
+
+
+# ==========================================================
+# SOURCES
+# ==========================================================
+class YFinanceSource:
+    """Yahoo Finance websocket feed, reconnecting in a daemon thread."""
+
+    def __init__(self, retry_seconds=5):
+        self.retry_seconds = retry_seconds
+        self.symbols = set()
+        self.ws = None
+        self.lock = threading.Lock()
+
+    def start(self, publish):
+        threading.Thread(target=self._run, args=(publish,), daemon=True).start()
+
+    def _run(self, publish):
+        while True:
+            with self.lock:
+                symbols = list(self.symbols)
+            if not symbols:
+                time.sleep(1)
+                continue
+            try:
+                ws = yf.WebSocket(verbose=False)
+                ws.subscribe(symbols)
+                with self.lock:
+                    self.ws = ws
+                    missing = self.symbols - set(symbols)
+                if missing:
+                    ws.subscribe(list(missing))
+                ws.listen(publish)  # returns when the connection drops
+            except Exception:
+                pass
+            with self.lock:
+                self.ws = None
+            time.sleep(self.retry_seconds)
+
+    def subscribe(self, symbols):
+        with self.lock:
+            self.symbols.update(symbols)
+            if self.ws is not None:
+                try:
+                    self.ws.subscribe(list(symbols))
+                except Exception:
+                    pass
+
+    def unsubscribe(self, symbols):
+        with self.lock:
+            self.symbols.difference_update(symbols)
+            if self.ws is not None:
+                try:
+                    self.ws.unsubscribe(list(symbols))
+                except Exception:
+                    pass
+
+
+class ReplaySource:
+    """Replays recorded ticks (dicts or a JSON-lines file) for tests and demos.
+
+    Only ticks for subscribed symbols are published.
+    """
+
+    def __init__(self, ticks, delay=0.0, loop=False):
+        if isinstance(ticks, str):
+            with open(ticks) as f:
+                ticks = [json.loads(line) for line in f if line.strip()]
+        self.ticks = list(ticks)
+        self.delay = delay
+        self.loop = loop
+        self.symbols = set()
+
+    def start(self, publish):
+        threading.Thread(target=self._run, args=(publish,), daemon=True).start()
+
+    def _run(self, publish):
+        while True:
+            for tick in self.ticks:
+                if tick.get("id") in self.symbols:
+                    publish(tick)
+                if self.delay:
+                    time.sleep(self.delay)
+            if not self.loop:
+                return
+
+    def subscribe(self, symbols):
+        self.symbols.update(symbols)
+
+    def unsubscribe(self, symbols):
+        self.symbols.difference_update(symbols)
+
+
+# ==========================================================
+# PUB/SUB HUB
+# ==========================================================
+class QuoteHub:
+    """In-memory pub/sub of the latest tick per symbol.
+
+    The source starts on the first subscription, so a replay does not
+    run through its ticks before anyone is watching.
+    """
+
+    def __init__(self, source, lease_seconds=LEASE_SECONDS):
+        self.source = source
+        self.lease_seconds = lease_seconds
+        self.quotes = {}
+        self.seen = {}
+        self.listeners = defaultdict(list)
+        self.lock = threading.Lock()
+        self.started = False
+
+    def publish(self, tick):
+        """Store a tick and notify server-side listeners (source thread)."""
+        symbol = tick.get("id")
+        if not symbol or "price" not in tick:
+            return
+        self.quotes[symbol] = tick
+        for callback in self.listeners.get(symbol, ()):
+            try:
+                callback(tick)
+            except Exception:
+                pass
+
+    def watch(self, symbols):
+        """Renew the lease on symbols, subscribing upstream on first use."""
+        now = time.monotonic()
+        with self.lock:
+            new = [s for s in symbols if s not in self.seen]
+            for s in symbols:
+                self.seen[s] = now
+            expired = [
+                s for s, t in self.seen.items()
+                if now - t > self.lease_seconds and s not in self.listeners
+            ]
+            for s in expired:
+                del self.seen[s]
+                self.quotes.pop(s, None)
+        if new:
+            self._subscribe(new)
+        if expired:
+            self.source.unsubscribe(expired)
+
+    def listen(self, symbol, callback):
+        """Call callback(tick) on every tick of symbol, until unlisten."""
+        with self.lock:
+            self.listeners[symbol].append(callback)
+            new = symbol not in self.seen
+            self.seen[symbol] = time.monotonic()
+        if new:
+            self._subscribe([symbol])
+
+    def _subscribe(self, symbols):
+        self.source.subscribe(symbols)
+        with self.lock:
+            start, self.started = not self.started, True
+        if start:
+            self.source.start(self.publish)
+
+    def unlisten(self, symbol, callback):
+        with self.lock:
+            self.listeners[symbol].remove(callback)
+            if not self.listeners[symbol]:
+                del self.listeners[symbol]
+
+    def latest(self, symbol):
+        """Latest tick for symbol, or None before the first one."""
+        return self.quotes.get(symbol)
+
+
+@st.cache_resource
+def get_quote_hub():
+    """Process-wide hub on the Yahoo Finance feed."""
+    return QuoteHub(YFinanceSource())
+
+
+# ==========================================================
+# LIVE TILES
+# ==========================================================
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_metric(label, symbol, value, delta=None, unit="", decimals=2):
+    """st.metric that updates in place from the quote hub.
+
+    value/delta are the snapshot shown until the first tick arrives.
+    """
+    hub = get_quote_hub()
+    hub.watch([symbol])
+    tick = hub.latest(symbol)
+    if tick is not None:
+        value = f"{tick['price']:.{decimals}f}"
+        if "change" in tick and "change_percent" in tick:
+            delta = f"{tick['change']:+.{decimals}f} ({tick['change_percent']:+.2f}%)"
+    st.metric(label, f"{value} {unit}".strip(), delta)
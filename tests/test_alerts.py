@@ -0,0 +1,80 @@
+import queue
+import numpy as np
+import pandas as pd
+import pytest
+from alerts import AlertEngine, QueueSink, Rule
+
+
+def history(closes, volume=1000):
+    index = pd.date_range("2024-01-01", periods=len(closes), freq="D", name="Date")
+    close = np.asarray(closes, dtype=float)
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": volume}, index=index,
+    )
+
+
+def drain(q):
+    alerts = []
+    while not q.empty():
+        alerts.append(q.get())
+    return alerts
+
+
+def engine(*rules):
+    q = queue.Queue()
+    return AlertEngine(list(rules), QueueSink(q)), q
+
+
+def test_rule_parsing():
+    rule = Rule("RSI < 30", ["A.NS"])
+    assert (rule.left, rule.right) == ("RSI", 30.0)
+    assert rule.applies_to("A.NS") and not rule.applies_to("B.NS")
+    assert Rule("Close crosses_above SMA_20").indicators() == {"SMA_20"}
+    assert Rule("Signal > MACD").indicators() == {"MACD"}
+    with pytest.raises(ValueError):
+        Rule("RSI is low")
+    with pytest.raises(ValueError):
+        Rule("RSI << 30")
+
+
+def test_seeding_only_evaluates_the_latest_bar():
+    alerts, q = engine(Rule("Close > 0"))
+    assert alerts.update("A.NS", history(range(1, 101))) == 1
+    (alert,) = drain(q)
+    assert alert["symbol"] == "A.NS" and alert["left"] == 100.0
+
+
+def test_update_processes_only_new_bars_and_fires_on_edges():
+    alerts, q = engine(Rule("Close > 105"))
+    closes = list(range(100, 111))
+    alerts.update("A.NS", history(closes[:5]))  # last close 104
+    assert alerts.update("A.NS", history(closes[:5])) == 0  # nothing new
+    assert alerts.update("A.NS", history(closes[:7])) == 1  # 106 crosses the level
+    assert alerts.update("A.NS", history(closes)) == 0  # still above: no repeat
+    assert [a["left"] for a in drain(q)] == [106.0]
+
+
+def test_crosses_above_indicator():
+    alerts, q = engine(Rule("Close crosses_above SMA_3"))
+    closes = [10, 10, 10, 9, 8, 12]
+    alerts.update("A.NS", history(closes[:5]))
+    assert alerts.update("A.NS", history(closes)) == 1
+    assert drain(q)[-1]["rule"] == "Close crosses_above SMA_3"
+
+
+def test_ticks_keep_the_bar_volume():
+    alerts, q = engine(Rule("Volume > 500"))
+    alerts.update("A.NS", history([1, 2, 3]))
+    assert len(drain(q)) == 1
+    for price in [3.1, 3.2, 3.3]:
+        alerts.on_tick({"id": "A.NS", "price": price})
+    alerts.update("A.NS", history([1, 2, 3.4]))  # the bar closes with its volume
+    assert drain(q) == []
+
+
+def test_rules_added_later_are_compiled_on_next_data():
+    alerts, q = engine(Rule("Close > 1000"))
+    alerts.update("A.NS", history([1, 2, 3]))
+    alerts.add_rule(Rule("Close > 2"))
+    assert alerts.update("A.NS", history([1, 2, 3])) == 1
+    assert drain(q)[0]["rule"] == "Close > 2"
@@ -0,0 +1,16 @@
+import numpy as np
+from backtest import STATS, sweep_sma_crossover
+
+
+def test_sweep_without_valid_pairs_returns_empty_stats():
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, 300))
+    stats = sweep_sma_crossover(close, range(100, 201, 10), range(10, 51, 10))
+    assert stats.empty
+    assert list(stats.columns) == STATS
+    assert stats.index.names == ["Fast", "Slow"]
+
+
+def test_sweep_evaluates_pairs_with_fast_below_slow():
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, 300))
+    stats = sweep_sma_crossover(close, [10, 20], [20, 50])
+    assert list(stats.index) == [(10, 20), (10, 50), (20, 50)]
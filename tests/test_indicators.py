@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from indicators import IndicatorSet, add_indicators
+
+INDICATORS = ["SMA_20", "EMA_10", "ATR", "MACD", "RSI"]
+
+
+def history(n=300):
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+    index = pd.date_range("2024-01-01 09:15", periods=n, freq="min", name="Datetime")
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close}, index=index)
+
+
+def batch(df):
+    return add_indicators(df.copy(), INDICATORS)[IndicatorSet(INDICATORS).columns()]
+
+
+def test_sync_bar_by_bar_matches_batch():
+    df = history()
+    state = IndicatorSet(INDICATORS)
+    for k in range(200, len(df) + 1):
+        out = state.sync(df.iloc[:k])
+    np.testing.assert_allclose(out.to_numpy(), batch(df).to_numpy(), atol=1e-9)
+
+
+def test_revised_last_bar_matches_batch():
+    df = history()
+    state = IndicatorSet(INDICATORS)
+    state.sync(df)
+    revised = df.copy()
+    revised.iloc[-1, revised.columns.get_loc("Close")] += 5
+    np.testing.assert_allclose(state.sync(revised).to_numpy(), batch(revised).to_numpy(), atol=1e-9)
+
+
+def test_back_adjusted_history_rebuilds():
+    df = history()
+    state = IndicatorSet(INDICATORS)
+    state.sync(df)
+    adjusted = df * 0.9
+    np.testing.assert_allclose(state.sync(adjusted).to_numpy(), batch(adjusted).to_numpy(), atol=1e-9)
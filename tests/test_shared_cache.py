@@ -0,0 +1,102 @@
+import os
+import sys
+import subprocess
+import textwrap
+import numpy as np
+import pandas as pd
+import pytest
+import shared_cache
+from shared_cache import FileBackend, KVBackend, MemoryKV, deserialize, process_cache, serialize, shared
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def history():
+    index = pd.date_range("2024-01-01 09:15", periods=5, freq="min", tz="Asia/Kolkata", name="Datetime")
+    return pd.DataFrame({"Close": [1.0, np.nan, 3.0, 4.0, 5.0], "Volume": [10, 20, 30, 40, 50]}, index=index)
+
+
+def snapshot():
+    index = pd.date_range("2024-01-01", periods=3, freq="D", name="Date")
+    columns = pd.MultiIndex.from_product([["Close", "Volume"], ["A.NS", "B.NS"]], names=["Price", "Ticker"])
+    return pd.DataFrame(np.arange(12, dtype=float).reshape(3, 4), index=index, columns=columns)
+
+
+@pytest.fixture
+def backend():
+    backend = KVBackend(MemoryKV())
+    shared_cache.set_backend(backend)
+    yield backend
+    shared_cache.set_backend(None)
+
+
+@pytest.mark.parametrize("frame", [history(), snapshot()], ids=["tz-aware", "multiindex"])
+def test_arrow_round_trip(frame):
+    restored = deserialize(serialize(frame, ttl=60))
+    pd.testing.assert_frame_equal(restored, frame, check_freq=False)
+
+
+def test_expired_payload_is_ignored():
+    buffer = serialize(history(), ttl=-1)
+    assert deserialize(buffer) is None
+    assert deserialize(buffer, allow_expired=True) is not None
+
+
+def test_file_backend_is_reused_across_processes(tmp_path):
+    child = textwrap.dedent("""
+        import pandas as pd
+        from shared_cache import shared
+
+        @shared(ttl=60)
+        def fetch_value(symbol):
+            return pd.DataFrame({"Close": [1.0, 2.0]}, index=pd.Index([0, 1], name="i"))
+
+        fetch_value("A.NS")
+    """)
+    env = dict(os.environ, YFD_SHARED_CACHE=f"file://{tmp_path}", PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-c", child], check=True, cwd=ROOT, env=env)
+
+    shared_cache.set_backend(FileBackend(str(tmp_path)))
+    try:
+        @shared(ttl=60)
+        def fetch_value(symbol):
+            raise AssertionError("should have been served by the other process's file")
+
+        assert fetch_value("A.NS")["Close"].tolist() == [1.0, 2.0]
+    finally:
+        shared_cache.set_backend(None)
+
+
+def test_clear_invalidates_the_shared_backend(backend):
+    calls = []
+
+    @process_cache(ttl=60)
+    @shared(ttl=60)
+    def fetch_value(symbol):
+        calls.append(symbol)
+        return [symbol]
+
+    fetch_value("A.NS")
+    fetch_value("B.NS")
+    fetch_value.cache.clear()  # this process only: the backend still serves both
+    fetch_value("A.NS")
+    assert calls == ["A.NS", "B.NS"]
+
+    fetch_value.clear("A.NS")
+    fetch_value("A.NS")
+    fetch_value("B.NS")
+    assert calls == ["A.NS", "B.NS", "A.NS"]
+
+    fetch_value.clear()
+    fetch_value("A.NS")
+    fetch_value("B.NS")
+    assert calls == ["A.NS", "B.NS", "A.NS", "A.NS", "B.NS"]
+
+
+def test_exceptions_are_not_shared(backend):
+    @shared(ttl=60)
+    def fetch_value(symbol):
+        return ValueError(symbol)
+
+    fetch_value("A.NS")
+    assert backend.client.scan_iter("yfd:*") == []
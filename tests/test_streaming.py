@@ -0,0 +1,61 @@
+import time
+from streaming import QuoteHub, ReplaySource
+
+TICKS = [{"id": "A.NS", "price": 1.0}, {"id": "B.NS", "price": 10.0}, {"id": "A.NS", "price": 2.0}]
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class CountingSource(ReplaySource):
+    starts = 0
+
+    def start(self, publish):
+        self.starts += 1
+        super().start(publish)
+
+
+def test_source_starts_on_first_subscription():
+    source = CountingSource(TICKS)
+    hub = QuoteHub(source)
+    time.sleep(0.05)
+    assert source.starts == 0
+    hub.watch(["A.NS"])
+    hub.watch(["B.NS"])
+    assert source.starts == 1
+
+
+def test_first_ticks_reach_the_first_watcher():
+    hub = QuoteHub(ReplaySource(TICKS))
+    hub.watch(["A.NS"])
+    assert wait_for(lambda: (hub.latest("A.NS") or {}).get("price") == 2.0)
+    assert hub.latest("B.NS") is None  # never subscribed
+
+
+def test_listen_and_unlisten():
+    hub = QuoteHub(ReplaySource(TICKS, delay=0.05))
+    prices = []
+
+    def callback(tick):
+        prices.append(tick["price"])
+
+    hub.listen("A.NS", callback)
+    assert wait_for(lambda: prices == [1.0, 2.0])
+    hub.unlisten("A.NS", callback)
+    assert "A.NS" not in hub.listeners
+
+
+def test_expired_lease_unsubscribes():
+    source = ReplaySource([])
+    hub = QuoteHub(source, lease_seconds=0)
+    hub.watch(["A.NS"])
+    assert source.symbols == {"A.NS"}
+    time.sleep(0.01)
+    hub.watch(["B.NS"])
+    assert source.symbols == {"B.NS"}
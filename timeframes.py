@@ -0,0 +1,85 @@
+# ==========================================================
+# timeframes.py — Several intervals of one symbol from one fetch
+# ==========================================================
+#
+# Only the finest interval is fetched; coarser bars are aggregated
+# locally (first/max/min/last/sum), aligned to NSE sessions, so extra
+# panels cost no extra upstream requests.
+
+import streamlit as st
+from functions import fetch_history, plot_multi_timeframe, show_error
+
+SESSION_TIMEZONE = "Asia/Kolkata"
+
+# interval -> (pandas rule, offset); NSE hourly bars start at 09:15
+RULES = {
+    "1m": ("1min", None),
+    "5m": ("5min", None),
+    "15m": ("15min", None),
+    "30m": ("30min", "15min"),
+    "1h": ("1h", "15min"),
+    "1d": ("1D", None),
+    "1wk": ("W-MON", None),
+}
+TIMEFRAMES = list(RULES)
+
+# longest period Yahoo serves for each base interval
+MAX_PERIODS = {
+    "1m": ["1d", "5d"],
+    "5m": ["1d", "5d", "1mo"],
+    "15m": ["1d", "5d", "1mo"],
+    "30m": ["1d", "5d", "1mo"],
+    "1h": ["5d", "1mo", "3mo", "6mo", "1y"],
+    "1d": ["1mo", "3mo", "6mo", "1y", "2y", "5y"],
+    "1wk": ["6mo", "1y", "2y", "5y", "10y"],
+}
+
+AGGREGATION = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def resample_ohlcv(df, interval, timezone=SESSION_TIMEZONE):
+    """Aggregate OHLCV bars to a coarser interval in the session timezone."""
+    rule, offset = RULES[interval]
+    index = df.index.tz_convert(timezone) if df.index.tz is not None else df.index
+    columns = {c: f for c, f in AGGREGATION.items() if c in df}
+    kwargs = {"label": "left", "closed": "left"}
+    if offset:
+        kwargs["offset"] = offset
+    bars = df[list(columns)].set_axis(index).resample(rule, **kwargs).agg(columns)
+    return bars.dropna(subset=["Close"])
+
+
+def multi_timeframe(ticker: str, intervals: tuple, period: str):
+    """{interval: bars} from one fetch at the finest interval, or an Exception.
+
+    Not cached itself: the history is the shared fetch_history copy and
+    resampling it is cheap, so a Refresh or an upstream error shows at once.
+    """
+    intervals = sorted(intervals, key=TIMEFRAMES.index)
+    base = intervals[0]
+    hist = fetch_history(ticker, period=period, interval=base)
+    if isinstance(hist, Exception):
+        return hist
+    return {
+        interval: hist if interval == base else resample_ohlcv(hist, interval)
+        for interval in intervals
+    }
+
+
+@st.fragment
+def multi_timeframe_panel(ticker, default=("5m", "1h", "1d")):
+    """Interval picker and the linked multi-timeframe chart; reruns on its own."""
+    col1, col2 = st.columns([3, 1])
+    intervals = col1.multiselect("Timeframes:", TIMEFRAMES, default=list(default), key=f"mtf_{ticker}")
+    if not intervals:
+        st.info("Select at least one timeframe.")
+        return
+    base = min(intervals, key=TIMEFRAMES.index)
+    periods = MAX_PERIODS[base]
+    period = col2.selectbox("Period:", periods, index=len(periods) - 1, key=f"mtf_period_{ticker}_{base}")
+    frames = multi_timeframe(ticker, tuple(intervals), period)
+    if isinstance(frames, Exception):
+        show_error(frames)
+        return
+    st.caption(f"One {base} fetch; coarser timeframes aggregated locally.")
+    st.plotly_chart(plot_multi_timeframe(frames, title=ticker), use_container_width=True)
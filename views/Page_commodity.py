@@ -1,7 +1,10 @@
 from functions import *
 from contact import contact_form
-from streamlit_javascript import st_javascript
-from zoneinfo import ZoneInfo
+from streaming import live_metric
+from indicators import clear_indicator_state, indicators_for
+from export import export_panel
+from volume import STUDIES, add_volume_studies
+from dataclient import get_data_client
 
 @st.dialog("Contact Me")
 def show_contact_form():
@@ -29,18 +32,11 @@ st.html("""
 """)
 
 # ----TIME ZONE----
-if 'timezone' not in st.session_state:
-    timezone = st_javascript("""await (async () => {
-                    const userTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
-                    return userTimezone
-                    })().then(returnValue => returnValue)""")
-    if isinstance(timezone, int):
-        st.stop()
-    st.session_state['timezone'] = ZoneInfo(timezone)
+init_timezone()
 
 # ----SESSION STATE -----
 all_my_widget_keys_to_keep = {
-    'current_time_commodity_page': datetime.datetime.now(st.session_state['timezone']).replace(microsecond=0, tzinfo=None),
+    'current_time_commodity_page': now_utc(),
     'tickers': "MSFT",
     'dark_mode': False,
     'toggle_theme': False,
@@ -125,17 +121,30 @@ with st.sidebar:
         )
         INDICATORS = [indicator.replace("X", str(TIME_SPAN)) if '_X' in indicator else indicator for indicator in INDICATORS]
 
+    VOLUME_STUDIES = st.multiselect(
+        label="Volume studies:",
+        options=STUDIES,
+        help="VWAP resets every session and needs an intraday interval"
+    )
+
+    LIVE = st.toggle(
+        label="Live quotes",
+        value=False,
+        help="Stream prices into the tiles"
+    )
+
     st.write("")
     button = st.button("Refresh data")
 
     if button:
-        st.session_state['current_time_commodity_page'] = datetime.datetime.now(st.session_state['timezone']).replace(microsecond=0, tzinfo=None)
+        st.session_state['current_time_commodity_page'] = now_utc()
         fetch_table.clear()
         fetch_info.clear()
         fetch_history.clear()
+        clear_indicator_state()
         # st.cache_data.clear()
 
-    st.write("Last update:", st.session_state['current_time_commodity_page'])
+    show_last_update(st.session_state['current_time_commodity_page'])
 
     st.sidebar.markdown("Made with ❤️ by Leonardo")
     button = st.button("✉️ Contact Me", key="contact")
@@ -164,14 +173,19 @@ st.title("Commodity Market")
 
 URL = "https://finance.yahoo.com/markets/commodities/"
 
-df = fetch_table(URL)
+# Submit both requests up front to the background data client; each
+# section below waits only for its own data
+client = get_data_client()
+pending_table = client.submit(fetch_table, URL)
+pending_hist = client.submit(fetch_history, COMMODITY, period=PERIOD, interval=INTERVAL)
+
+df = pending_table.result()
 
 COMMODITIES = ["GC=F", "SI=F", "HG=F", "NG=F", "BZ=F", "KC=F", "KE=F", "ZS=F"]
 
 st.subheader("Top Commodities")
 if isinstance(df, Exception):
-    st.error(df)
-    fetch_table.clear(URL)
+    show_error(df)
 else:
     with st.container(border=True):
         i = 0
@@ -183,11 +197,20 @@ else:
                     name = row['Name']
                     symbol = row['Symbol']
                     price, change, change_pt = row['Price'].split()
-                    st.metric(
-                        label=f'{name}',
-                        value=f'{price}',
-                        delta=f'{change} {change_pt}'
-                    )
+                    if LIVE:
+                        live_metric(
+                            label=f'{name}',
+                            symbol=symbol,
+                            value=f'{price}',
+                            delta=f'{change} {change_pt}',
+                            decimals=2
+                        )
+                    else:
+                        st.metric(
+                            label=f'{name}',
+                            value=f'{price}',
+                            delta=f'{change} {change_pt}'
+                        )
                 i += 1
 
 #----SECOND SECTION----
@@ -198,13 +221,12 @@ st.header(TITLE)
 
 # info = fetch_info(COMMODITY)
 
-hist = fetch_history(COMMODITY, period=PERIOD, interval=INTERVAL)
+hist = pending_hist.result()
 if isinstance(hist, Exception):
-    st.error(hist)
-    fetch_history.clear(COMMODITY, period=PERIOD, interval=INTERVAL)
+    show_error(hist)
     st.stop()
 
-df = hist.copy()
+df = hist.copy(deep=False)
 
 if not TOGGLE_VOL:
     df = df.drop(columns=['Volume'], axis=1)
@@ -212,55 +234,22 @@ else:
     df['ΔVolume%'] = df['Volume'].pct_change(periods=1) * 100
     df['ΔVolume%'] = df['ΔVolume%'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else None)
 
-for INDICATOR in INDICATORS:
-    if "SMA" in INDICATOR:
-        window = int(INDICATOR.split("_")[1])
-        df[INDICATOR] = df['Close'].rolling(window=window, min_periods=1).mean()
-    if "EMA" in INDICATOR:
-        window = int(INDICATOR.split("_")[1])
-        df[INDICATOR] = df['Close'].ewm(span=window, adjust=False, min_periods=1).mean()
-
-if "ATR" in INDICATORS:
-
-    Prev_Close = df['Close'].shift(1)
-    High_Low = df['High'] - df['Low']
-    High_PrevClose = abs(df['High'] - Prev_Close)
-    Low_PrevClose = abs(df['Low'] - Prev_Close)
-
-    df['TR'] = pd.concat([High_Low, High_PrevClose, Low_PrevClose], axis=1).max(axis=1)
-
-    df['ATR'] = df['TR'].rolling(window=14, min_periods=1).mean()
-
-    df = df.drop(columns=['TR'], axis=1)
+df = indicators_for((COMMODITY, PERIOD, INTERVAL), df, INDICATORS)
 
-if "MACD" in INDICATORS:
-
-    ema_short = df['Close'].ewm(span=12, adjust=False, min_periods=1).mean()
-    ema_long = df['Close'].ewm(span=26, adjust=False, min_periods=1).mean()
-    df['MACD'] = ema_short - ema_long
-    df['Signal'] = df['MACD'].ewm(span=9, adjust=False, min_periods=1).mean()
-    df['MACD_Hist'] = df['MACD'] - df['Signal']
-
-if "RSI" in INDICATORS:
-
-    # delta = df['Close'].diff()
-    delta = df['Close'].pct_change(periods=1) * 100
-
-    # Separate gains and losses
-    gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
-
-    # Calculate the relative strength (RS)
-    rs = gain / loss
-
-    df['RSI'] = 100 - (100 / (1 + rs))
+ANCHOR = None
+if "Anchored VWAP" in VOLUME_STUDIES:
+    ANCHOR = st.selectbox(
+        label="Anchor VWAP at:",
+        options=df.index,
+        format_func=lambda t: t.strftime("%Y-%m-%d %H:%M")
+    )
+df, PROFILE, LEVELS = add_volume_studies(df, hist, INTERVAL, VOLUME_STUDIES, anchor=ANCHOR)
 
-fig = plot_candles_stick_bar(df, "Candlestick Chart")
+fig = plot_candles_stick_bar(df, "Candlestick Chart", profile=PROFILE, levels=LEVELS)
 
 st.plotly_chart(fig, use_container_width=True)
 
-with st.expander("Show data"):
-    st.dataframe(
-        data=df.reset_index(),
-        hide_index=True
-    )
+paged_table(df, key="commodity_data", hide_index=True)
+
+with st.expander("Export"):
+    export_panel(df, f"{COMMODITY}_{PERIOD}_{INTERVAL}", key="commodity_export")
@@ -1,194 +1,89 @@
 # ---- IMPORTS ----
 import streamlit as st
-import pandas as pd
-import numpy as np
-import datetime
-import yfinance as yf
-import requests
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.colors as pc
-
-# ---- STREAMLIT CACHING HELPERS ----
-@st.cache_data(ttl=3600)
-def fetch_info(ticker: str):
-    """Fetch stock or index info from Yahoo Finance"""
-    try:
-        ticker = yf.Ticker(ticker)
-        return ticker.info
-    except Exception as e:
-        return e
-
-
-@st.cache_data(ttl=3600)
-def fetch_history(ticker: str, period="6mo", interval="1d", start=None):
-    """Fetch historical price data"""
-    try:
-        t = yf.Ticker(ticker)
-        if start:
-            return t.history(start=start, interval=interval)
-        else:
-            return t.history(period=period, interval=interval)
-    except Exception as e:
-        return e
-
-
-@st.cache_data(ttl=3600)
-def fetch_balance(ticker: str, tp="Annual"):
-    """Fetch balance sheet"""
-    try:
-        t = yf.Ticker(ticker)
-        if tp == "Annual":
-            return t.balance_sheet
-        else:
-            return t.quarterly_balance_sheet
-    except Exception as e:
-        return e
-
-
-@st.cache_data(ttl=3600)
-def fetch_income(ticker: str, tp="Annual"):
-    """Fetch income statement"""
-    try:
-        t = yf.Ticker(ticker)
-        if tp == "Annual":
-            return t.income_stmt
-        else:
-            return t.quarterly_income_stmt
-    except Exception as e:
-        return e
-
-
-@st.cache_data(ttl=3600)
-def fetch_cash(ticker: str, tp="Annual"):
-    """Fetch cash flow"""
-    try:
-        t = yf.Ticker(ticker)
-        if tp == "Annual":
-            return t.cashflow
-        else:
-            return t.quarterly_cashflow
-    except Exception as e:
-        return e
-
-
-@st.cache_data(ttl=3600)
-def fetch_table(url: str):
-    """Fetch table from Yahoo Finance HTML page"""
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        df_list = pd.read_html(response.content)
-        return df_list[0]
-    except Exception as e:
-        return e
-
-
-def remove_duplicates(lst):
-    """Remove duplicates while preserving order"""
-    seen = set()
-    result = []
-    for item in lst:
-        if item not in seen:
-            seen.add(item)
-            result.append(item)
-    return result
-
-
-# ---- INDIAN INDICES ----
-INDIAN_INDICES = {
-    "NIFTY 50": "^NSEI",
-    "SENSEX": "^BSESN",
-    "BANKNIFTY": "^NSEBANK",
-    "FINNIFTY": "^CNXFIN",
-    "NIFTY NEXT 50": "^NSMIDCP",
-    "NIFTY MIDCAP 50": "^NSEMDCP50",
-    "NIFTY MIDCAP 100": "^NSEMDCP100",
-    "NIFTY SMALLCAP 50": "^NSESMLCP50",
-    "NIFTY SMALLCAP 100": "^NSESMLCP100",
-    "NIFTY FMCG": "^CNXFMCG",
-    "NIFTY IT": "^CNXIT",
-    "NIFTY AUTO": "^CNXAUTO",
-    "NIFTY METAL": "^CNXMETAL",
-    "NIFTY PHARMA": "^CNXPHARMA",
-    "NIFTY REALTY": "^CNXREALTY",
-    "NIFTY ENERGY": "^CNXENERGY",
-    "NIFTY PSU BANK": "^CNXPSUBANK",
-    "INDIA VIX": "^INDIAVIX",
-}
-
-# ---- FNO STOCKS ----
-@st.cache_data(ttl=86400)
-def fetch_fno_list():
-    """Fetch NSE F&O stock list from NSE website"""
-    try:
-        url = "https://archives.nseindia.com/content/fo/fo_underlyings.csv"
-        df = pd.read_csv(url)
-        df = df.dropna(subset=["SYMBOL"])
-        symbols = [f"{x}.NS" for x in df["SYMBOL"].tolist()]
-        return symbols
-    except Exception:
-        # Fallback static list (Top 20 F&O)
-        return [
-            "RELIANCE.NS", "TCS.NS", "INFY.NS", "ICICIBANK.NS", "HDFCBANK.NS",
-            "SBIN.NS", "AXISBANK.NS", "LT.NS", "ITC.NS", "BHARTIARTL.NS",
-            "MARUTI.NS", "KOTAKBANK.NS", "HCLTECH.NS", "SUNPHARMA.NS",
-            "ADANIENT.NS", "ADANIPORTS.NS", "TITAN.NS", "ONGC.NS", "WIPRO.NS", "ULTRACEMCO.NS"
-        ]
-
-
-# ---- VISUALIZATION FUNCTIONS ----
-def plot_balance(df, ticker="", currency="INR"):
-    df.columns = pd.to_datetime(df.columns).strftime('%Y')
-    fig = go.Figure()
-    if "Total Assets" in df.index:
-        fig.add_trace(go.Bar(
-            x=df.columns, y=df.loc["Total Assets"], name="Total Assets", marker_color="green"
-        ))
-    if "Total Liabilities Net Minority Interest" in df.index:
-        fig.add_trace(go.Bar(
-            x=df.columns, y=df.loc["Total Liabilities Net Minority Interest"],
-            name="Total Liabilities", marker_color="red"
-        ))
-    if "Stockholders Equity" in df.index:
-        fig.add_trace(go.Bar(
-            x=df.columns, y=df.loc["Stockholders Equity"], name="Equity", marker_color="blue"
-        ))
-    fig.update_layout(
-        barmode="group",
-        title=f"Balance Sheet — {ticker}",
-        yaxis_title=f"Amount ({currency})",
-        xaxis_title="Year",
+from functions import fetch_info
+from fundamentals import FREQUENCIES, STATEMENTS, load_fundamentals, statement_table
+from export import export_panel
+from ratios import RATIOS, compute_ratios, rank_by, ratio_table
+
+# ---- PAGE ----
+st.set_page_config(
+    page_title="Financials",
+    page_icon=":material/finance:",
+    layout="wide",
+    initial_sidebar_state="auto",
+    menu_items={"Get help": "https://github.com/LMAPcoder"}
+)
+
+with st.sidebar:
+    TICKERS = st.text_input(
+        label="Peer tickers:",
+        value="RELIANCE.NS, TCS.NS, INFY.NS",
+        key="financial_tickers",
     )
-    return fig
-
-
-def plot_income(df, ticker="", currency="INR"):
-    df.columns = pd.to_datetime(df.columns).strftime('%Y')
-    fig = go.Figure()
-
-    if "Total Revenue" in df.index:
-        fig.add_trace(go.Bar(
-            x=df.columns,
-            y=df.loc["Total Revenue"],
-            name="Total Revenue",
-            marker_color="green"
-        ))
-
-    if "Net Income Common Stockholders" in df.index:
-        fig.add_trace(go.Bar(
-            x=df.columns,
-            y=df.loc["Net Income Common Stockholders"],
-            name="Net Income",
-            marker_color="orange"
-        ))
-
-    fig.update_layout(
-        barmode="group",
-        title=f"Income Statement — {ticker}",
-        yaxis_title=f"Amount ({currency})",
-        xaxis_title="Year",
-    )
-
-    return fig
-
+    TICKERS = [t.strip().upper() for t in TICKERS.split(",") if t.strip()]
+    if len(TICKERS) > 10:
+        st.warning("⚠️ Only first 10 tickers are processed.")
+        TICKERS = TICKERS[:10]
+
+    FREQUENCY = st.radio("Period:", FREQUENCIES, horizontal=True)
+
+st.title("Financials")
+
+if len(TICKERS) == 0:
+    st.warning("Please enter at least one ticker.")
+    st.stop()
+
+# All statements for all peers, fetched concurrently
+fundamentals, errors = load_fundamentals(TICKERS)
+
+for ticker, error in errors.items():
+    st.warning(f"{ticker}: {error}")
+
+if fundamentals.empty:
+    st.stop()
+
+STATEMENT = st.selectbox("Statement", options=list(STATEMENTS))
+
+rows = fundamentals[
+    (fundamentals["statement"] == STATEMENT) & (fundamentals["frequency"] == FREQUENCY)
+]
+items = sorted(rows["line_item"].unique())
+ITEM = st.selectbox(
+    "Line item",
+    options=items,
+    index=items.index("Total Revenue") if "Total Revenue" in items else 0,
+)
+
+peer = rows[rows["line_item"] == ITEM].pivot(index="period_end", columns="ticker", values="value")
+fig = go.Figure()
+for ticker in peer.columns:
+    fig.add_trace(go.Bar(x=peer.index, y=peer[ticker], name=ticker))
+fig.update_layout(barmode="group", title=f"{ITEM} — {FREQUENCY}", xaxis_title="Period end")
+st.plotly_chart(fig, use_container_width=True)
+
+for ticker in peer.columns:
+    with st.expander(f"{STATEMENT} — {ticker}"):
+        st.dataframe(statement_table(fundamentals, ticker, STATEMENT, FREQUENCY))
+
+with st.expander("Export statements"):
+    export_panel(fundamentals, "statements", key="statements_export")
+
+# ---- RATIOS ----
+st.header("Ratios")
+
+market_caps = {}
+for ticker in peer.columns:
+    info = fetch_info(ticker)
+    if not isinstance(info, Exception) and info.get("marketCap"):
+        market_caps[ticker] = info["marketCap"]
+
+PEERS = list(peer.columns)
+ratios, dates = compute_ratios(PEERS, frequency=FREQUENCY, market_caps=market_caps)
+st.dataframe(ratio_table(ratios, PEERS).style.format("{:.2f}", na_rep="—"))
+
+RATIO = st.selectbox("Rank by", options=list(RATIOS))
+ranking = rank_by(ratios, PEERS, RATIO)
+fig = go.Figure(go.Bar(x=ranking.index, y=ranking.values, name=RATIO))
+fig.update_layout(title=f"{RATIO} — latest {FREQUENCY.lower()} report")
+st.plotly_chart(fig, use_container_width=True)
@@ -1,7 +1,11 @@
 from functions import *
 from contact import contact_form
-from streamlit_javascript import st_javascript
-from zoneinfo import ZoneInfo
+from streaming import live_metric
+from indicators import clear_indicator_state, indicators_for
+from crossrates import CROSS_RATE_TOLERANCE, compare_to_direct, cross_rate, cross_rates, direct_ticker, leg_ticker
+from dataclient import get_data_client
+from resilience import PREFETCH
+from export import export_panel
 
 @st.dialog("Contact Me")
 def show_contact_form():
@@ -29,18 +33,11 @@ st.html("""
 """)
 
 # ----TIME ZONE----
-if 'timezone' not in st.session_state:
-    timezone = st_javascript("""await (async () => {
-                    const userTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
-                    return userTimezone
-                    })().then(returnValue => returnValue)""")
-    if isinstance(timezone, int):
-        st.stop()
-    st.session_state['timezone'] = ZoneInfo(timezone)
+init_timezone()
 
 # ----SESSION STATE -----
 all_my_widget_keys_to_keep = {
-    'current_time_forex_page': datetime.datetime.now(st.session_state['timezone']).replace(microsecond=0, tzinfo=None),
+    'current_time_forex_page': now_utc(),
     'tickers': "MSFT",
     'dark_mode': False,
     'toggle_theme': False,
@@ -156,17 +153,24 @@ with st.sidebar:
             )
             INDICATORS = [indicator.replace("X", str(TIME_SPAN)) if '_X' in indicator else indicator for indicator in INDICATORS]
 
+    LIVE = st.toggle(
+        label="Live quotes",
+        value=False,
+        help="Stream prices into the tiles"
+    )
+
     st.write("")
     button = st.button("Refresh data")
 
     if button:
-        st.session_state['current_time_forex_page'] = datetime.datetime.now(st.session_state['timezone']).replace(microsecond=0, tzinfo=None)
+        st.session_state['current_time_forex_page'] = now_utc()
         fetch_table.clear()
         fetch_info.clear()
         fetch_history.clear()
+        clear_indicator_state()
         # st.cache_data.clear()
 
-    st.write("Last update:", st.session_state['current_time_forex_page'])
+    show_last_update(st.session_state['current_time_forex_page'])
 
     st.sidebar.markdown("Made with ❤️ by Leonardo")
 
@@ -189,22 +193,36 @@ with st.sidebar:
 
 st.title("Forex Market")
 
+CURRENCIES_URL = "https://finance.yahoo.com/markets/currencies/"
+CRYPTOS_URL = "https://finance.yahoo.com/markets/crypto/all/"
+
+# Submit every request of the page up front to the background data
+# client; each section below waits only for its own data
+client = get_data_client()
+pending_tables = {url: client.submit(fetch_table, url) for url in [CURRENCIES_URL, CRYPTOS_URL]}
+if len(CURRENCY_1) == 1:
+    pending_info = client.submit(fetch_info, direct_ticker(CURRENCY_1[0], CURRENCY_2))
+    if "USD" not in (CURRENCY_1[0], CURRENCY_2):
+        # the direct quote the triangulated rate is checked against
+        client.submit(fetch_history, direct_ticker(CURRENCY_1[0], CURRENCY_2),
+                      period=PERIOD, interval=INTERVAL, priority=PREFETCH)
+for currency in set(CURRENCY_1) | {CURRENCY_2}:
+    if leg_ticker(currency):
+        client.submit(fetch_history, leg_ticker(currency), period=PERIOD, interval=INTERVAL, priority=PREFETCH)
+
 #----FIRST SECTION----
 
 col1, col2 = st.columns(2, gap="small")
 
 with col1:
 
-    URL = "https://finance.yahoo.com/markets/currencies/"
-
     CURRENCIES = ["EURUSD=X", "JPY=X", "GBPUSD=X", "AUDUSD=X", "CNY=X", "MXN=X", "INR=X", "SGD=X", "ZAR=X"]
 
-    df = fetch_table(URL)
+    df = pending_tables[CURRENCIES_URL].result()
 
     st.subheader("Top Currencies")
     if isinstance(df, Exception):
-        st.error(df)
-        fetch_table.clear(URL)
+        show_error(df)
     else:
         with st.container(border=True):
             i = 0
@@ -217,23 +235,29 @@ with col1:
                         name = row['Name']
                         symbol = row['Symbol']
                         price, change, change_pt = row['Price'].split()
-                        st.metric(
-                            label=f'{name}',
-                            value=f'{price}',
-                            delta=f'{change} {change_pt}'
-                        )
+                        if LIVE:
+                            live_metric(
+                                label=f'{name}',
+                                symbol=symbol,
+                                value=f'{price}',
+                                delta=f'{change} {change_pt}',
+                                decimals=4
+                            )
+                        else:
+                            st.metric(
+                                label=f'{name}',
+                                value=f'{price}',
+                                delta=f'{change} {change_pt}'
+                            )
                     i += 1
 
 with col2:
 
-    URL = "https://finance.yahoo.com/markets/crypto/all/"
-
-    df = fetch_table(URL)
+    df = pending_tables[CRYPTOS_URL].result()
 
     st.subheader("Top Cryptos")
     if isinstance(df, Exception):
-        st.error(df)
-        fetch_table.clear(URL)
+        show_error(df)
     else:
         with st.container(border=True):
             i = 0
@@ -245,11 +269,20 @@ with col2:
                         name = row['Name']
                         symbol = row['Symbol']
                         price, change, change_pt = row['Price'].split()
-                        st.metric(
-                            label=f'{name}',
-                            value=f'{price}',
-                            delta=f'{change} {change_pt}'
-                        )
+                        if LIVE:
+                            live_metric(
+                                label=f'{name}',
+                                symbol=symbol,
+                                value=f'{price}',
+                                delta=f'{change} {change_pt}',
+                                decimals=2
+                            )
+                        else:
+                            st.metric(
+                                label=f'{name}',
+                                value=f'{price}',
+                                delta=f'{change} {change_pt}'
+                            )
                     i += 1
 
 #----SECOND SECTION----
@@ -262,16 +295,10 @@ if len(CURRENCY_1) == 1:
 
     st.header(f'Currencies: {TITLE}')
 
-    if CURRENCY_1 in ["BTC", "ETH", "USTD"]:
-        TICKER = f'{CURRENCY_1}-{CURRENCY_2}'
-    else:
-        TICKER = f'{CURRENCY_1}{CURRENCY_2}=X'
-
-    info = fetch_info(TICKER)
+    info = pending_info.result()
 
     if isinstance(info, Exception):
-        st.error(info)
-        fetch_info.clear(TICKER)
+        show_error(info)
         st.stop()
 
     EXCHANGE_RATE = info.get('previousClose', 0)
@@ -295,63 +322,29 @@ if len(CURRENCY_1) == 1:
         value=f'{ASK_PRICE:.4f}'
     )
 
-    hist = fetch_history(TICKER, period=PERIOD, interval=INTERVAL)
+    hist = cross_rate(CURRENCY_1, CURRENCY_2, period=PERIOD, interval=INTERVAL)
 
     if isinstance(hist, Exception):
-        st.error(hist)
-        fetch_history.clear(TICKER, period=PERIOD, interval=INTERVAL)
+        show_error(hist)
         st.stop()
 
-    df = hist.copy()
-    df = df.drop(columns=['Volume'], axis=1)
-
-    for INDICATOR in INDICATORS:
-        if "SMA" in INDICATOR:
-            window = int(INDICATOR.split("_")[1])
-            df[INDICATOR] = df['Close'].rolling(window=window, min_periods=1).mean()
-        if "EMA" in INDICATOR:
-            window = int(INDICATOR.split("_")[1])
-            df[INDICATOR] = df['Close'].ewm(span=window, adjust=False, min_periods=1).mean()
-
-    if "ATR" in INDICATORS:
-
-        Prev_Close = df['Close'].shift(1)
-        High_Low = df['High'] - df['Low']
-        High_PrevClose = abs(df['High'] - Prev_Close)
-        Low_PrevClose = abs(df['Low'] - Prev_Close)
-
-        df['TR'] = pd.concat([High_Low, High_PrevClose, Low_PrevClose], axis=1).max(axis=1)
-
-        df['ATR'] = df['TR'].rolling(window=14, min_periods=1).mean()
+    df = hist.copy(deep=False)
 
-        df = df.drop(columns=['TR'], axis=1)
-
-    if "MACD" in INDICATORS:
-
-        ema_short = df['Close'].ewm(span=12, adjust=False, min_periods=1).mean()
-        ema_long = df['Close'].ewm(span=26, adjust=False, min_periods=1).mean()
-        df['MACD'] = ema_short - ema_long
-        df['Signal'] = df['MACD'].ewm(span=9, adjust=False, min_periods=1).mean()
-        df['MACD_Hist'] = df['MACD'] - df['Signal']
-
-    if "RSI" in INDICATORS:
-
-        # delta = df['Close'].diff()
-        delta = df['Close'].pct_change(periods=1) * 100
-
-        # Separate gains and losses
-        gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
-
-        # Calculate the relative strength (RS)
-        rs = gain / loss
-
-        df['RSI'] = 100 - (100 / (1 + rs))
+    df = indicators_for((TITLE, PERIOD, INTERVAL), df, INDICATORS)
 
     fig = plot_candles_stick_bar(df, "Candlestick Chart")
 
     st.plotly_chart(fig, use_container_width=True)
 
+    # Triangulated from two USD legs: spot-check it against the direct quote
+    if "USD" not in (CURRENCY_1, CURRENCY_2):
+        _, gap = compare_to_direct(CURRENCY_1, CURRENCY_2, period=PERIOD, interval=INTERVAL)
+        if gap > CROSS_RATE_TOLERANCE:
+            st.warning(
+                f"The triangulated {TITLE} rate differs from Yahoo's direct quote by {gap:.2%} "
+                f"(median), above the {CROSS_RATE_TOLERANCE:.2%} tolerance."
+            )
+
 
 else:
 
@@ -359,34 +352,24 @@ else:
 
     st.header(f'Currencies: {TITLE}')
 
-    TICKERS = list()
-
-    for currency in CURRENCY_1:
-
-        if currency in ["BTC", "ETH", "USTD"]:
-            TICKERS.append(f'{currency}-{CURRENCY_2}')
-        else:
-            TICKERS.append(f'{currency}{CURRENCY_2}=X')
+    rates = cross_rates(CURRENCY_1, CURRENCY_2, period=PERIOD, interval=INTERVAL)
 
     dfs_hist = list()
-    for TICKER in TICKERS:
-
-        hist = fetch_history(TICKER, period=PERIOD, interval=INTERVAL)
+    for currency, hist in rates.items():
 
         if isinstance(hist, Exception):
-            st.error(hist)
-            fetch_history.clear(TICKER, period=PERIOD, interval=INTERVAL)
+            show_error(hist)
 
         else:
-            hist.insert(0, 'Ticker', TICKER[:3])
+            hist.insert(0, 'Ticker', currency)
 
             hist['Pct_change'] = ((hist['Close'] - hist['Close'].iloc[0]) / hist['Close'].iloc[0])
 
             dfs_hist.append(hist)
 
-        if len(dfs_hist) == 0:
-            st.error("Error found")
-            st.stop()
+    if len(dfs_hist) == 0:
+        st.error("Error found")
+        st.stop()
 
     df = pd.concat(dfs_hist, ignore_index=False)
 
@@ -396,8 +379,7 @@ else:
 
     st.plotly_chart(fig, use_container_width=True)
 
-with st.expander("Show data"):
-    st.dataframe(
-        data=df.reset_index(),
-        hide_index=False
-    )
\ No newline at end of file
+paged_table(df, key="forex_data")
+
+with st.expander("Export"):
+    export_panel(df, f"{TITLE.replace('/', '')}_{PERIOD}_{INTERVAL}", key="forex_export")
@@ -4,8 +4,16 @@
 
 from functions import *
 from contact import contact_form
-from streamlit_javascript import st_javascript
-from zoneinfo import ZoneInfo
+from streaming import live_metric
+from indicators import clear_indicator_state, indicators_for
+from correlation import correlation_stats
+from backtest import equity_curve, sweep_sma_crossover
+from volume import STUDIES, add_volume_studies
+from timeframes import multi_timeframe_panel
+from breadth import fetch_sector_map, fetch_snapshot, market_breadth, market_universe
+from export import archive_panel, export_panel
+from dataclient import get_data_client
+from resilience import BULK, INTERACTIVE, priority
 import datetime
 import pandas as pd
 
@@ -35,14 +43,7 @@ st.html("""
 """)
 
 # ---------------- Timezone ----------------
-if "timezone" not in st.session_state:
-    timezone = st_javascript("""await (async () => {
-                    const userTimezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
-                    return userTimezone
-                    })().then(returnValue => returnValue)""")
-    if isinstance(timezone, int):
-        st.stop()
-    st.session_state["timezone"] = ZoneInfo(timezone)
+init_timezone()
 
 # ---------------- Session state ----------------
 if "tickers" not in st.session_state:
@@ -50,9 +51,7 @@ if "tickers" not in st.session_state:
 if "dark_mode" not in st.session_state:
     st.session_state["dark_mode"] = False
 if "current_time_price_page" not in st.session_state:
-    st.session_state["current_time_price_page"] = datetime.datetime.now(
-        st.session_state["timezone"]
-    ).replace(microsecond=0, tzinfo=None)
+    st.session_state["current_time_price_page"] = now_utc()
 
 # ======================================================
 # SIDEBAR — SELECTION
@@ -140,21 +139,29 @@ with st.sidebar:
             INDICATORS = [
                 i.replace("X", str(TIME_SPAN)) if "_X" in i else i for i in INDICATORS
             ]
+        VOLUME_STUDIES = st.multiselect(
+            "Volume studies:", options=STUDIES,
+            help="VWAP resets every session and needs an intraday interval",
+        )
     else:
         TOGGLE_VOL = False
         INDICATORS = []
+        VOLUME_STUDIES = []
+
+    # --- Live quotes ---
+    LIVE = st.toggle("Live quotes", value=False, help="Stream prices into the metric tiles")
 
     # --- Refresh ---
     if st.button("🔄 Refresh Data"):
         fetch_info.clear()
         fetch_history.clear()
+        clear_indicator_state()
         fetch_table.clear()
-        st.session_state["current_time_price_page"] = datetime.datetime.now(
-            st.session_state["timezone"]
-        ).replace(microsecond=0, tzinfo=None)
+        fetch_snapshot.clear()
+        st.session_state["current_time_price_page"] = now_utc()
         st.success("Data refreshed!")
 
-    st.write("Last update:", st.session_state["current_time_price_page"])
+    show_last_update(st.session_state["current_time_price_page"])
     st.markdown("---")
     st.markdown("Made with ❤️ by Leonardo")
     if st.button("✉️ Contact Me"):
@@ -176,10 +183,19 @@ if len(TICKERS) == 0:
 if market_type == "Indices":
     st.subheader("📈 Indian Indices Overview")
 
+    # One bulk snapshot of every index and F&O stock serves the tiles,
+    # the breadth figures and the treemap; it is bulk work for the
+    # upstream budget, so it never crowds out other pages' renders
+    with priority(BULK):
+        snapshot = fetch_snapshot(market_universe())
+    if isinstance(snapshot, Exception):
+        show_error(snapshot)
+        st.stop()
+    table, summary = market_breadth(snapshot, sectors=fetch_sector_map())
+
     cols = st.columns(3)
     for i, ticker in enumerate(TICKERS):
-        info = fetch_info(ticker)
-        if isinstance(info, Exception):
+        if ticker not in table.index:
             continue
         # Reverse lookup name
         try:
@@ -188,33 +204,42 @@ if market_type == "Indices":
             ]
         except Exception:
             name = ticker
-        price = info.get("regularMarketPrice", info.get("previousClose", 0))
-        change = info.get("regularMarketChangePercent", 0)
-        cols[i % 3].metric(
-            label=f"{name} ({ticker})",
-            value=f"{price:.2f}" if price else "—",
-            delta=f"{change:+.2f}%" if change else None,
-        )
-
-    # Optional: line charts for index trend
-    st.markdown("### 🪜 Index Trend")
-    for ticker in TICKERS:
-        hist = fetch_history(ticker, period="6mo", interval="1d")
-        if isinstance(hist, Exception):
-            st.error(f"Error fetching data for {ticker}")
-            continue
-        fig = plot_candles_stick(hist, title=ticker)
-        st.plotly_chart(fig, use_container_width=True)
+        price, change = table.loc[ticker, ["Close", "Change %"]]
+        value = f"{price:.2f}" if pd.notna(price) else "—"
+        delta = f"{change:+.2f}%" if pd.notna(change) else None
+        if LIVE:
+            with cols[i % 3]:
+                live_metric(f"{name} ({ticker})", ticker, value, delta)
+        else:
+            cols[i % 3].metric(label=f"{name} ({ticker})", value=value, delta=delta)
+
+    st.markdown("### 🧭 Market Breadth (F&O stocks)")
+    cols = st.columns(4)
+    cols[0].metric("Advances / Declines", f"{summary['Advances']} / {summary['Declines']}",
+                   f"{summary['Unchanged']} unchanged", delta_color="off")
+    cols[1].metric("Above SMA 50", f"{summary['% Above SMA_50']:.0f}%")
+    cols[2].metric("Above SMA 200", f"{summary['% Above SMA_200']:.0f}%")
+    cols[3].metric("52W Highs / Lows", f"{summary['New Highs']} / {summary['New Lows']}")
+
+    fig = plot_treemap(table[table["Sector"] != "Indices"], title="Sector heatmap — daily change, sized by traded value")
+    st.plotly_chart(fig, use_container_width=True)
     st.stop()
 
 # ------------------------------------------------------
 # F&O or STOCKS DASHBOARD MODE
 # ------------------------------------------------------
+# Every request is submitted up front to the background data client;
+# each section waits only for its own data, in render order
+client = get_data_client()
+
 if len(TICKERS) == 1:
     TICKER = TICKERS[0]
-    info = fetch_info(TICKER)
+    pending_info = client.submit(fetch_info, TICKER)
+    pending_hist = client.submit(fetch_history, TICKER, period=PERIOD, interval=INTERVAL)
+
+    info = pending_info.result()
     if isinstance(info, Exception):
-        st.error(info)
+        show_error(info)
         st.stop()
 
     NAME = info.get("shortName", TICKER)
@@ -230,52 +255,70 @@ if len(TICKERS) == 1:
     CHANGE = info.get("regularMarketChange", 0)
     CHGP = info.get("regularMarketChangePercent", 0)
     CURRENCY = info.get("currency", "INR")
-    st.metric("Current Price", f"{PRICE:.2f} {CURRENCY}", f"{CHANGE:+.2f} ({CHGP:+.2f}%)")
+    if LIVE:
+        live_metric("Current Price", TICKER, f"{PRICE:.2f}", f"{CHANGE:+.2f} ({CHGP:+.2f}%)", unit=CURRENCY)
+    else:
+        st.metric("Current Price", f"{PRICE:.2f} {CURRENCY}", f"{CHANGE:+.2f} ({CHGP:+.2f}%)")
 
     # History
-    hist = fetch_history(TICKER, period=PERIOD, interval=INTERVAL)
+    hist = pending_hist.result()
     if isinstance(hist, Exception):
-        st.error(hist)
+        show_error(hist)
         st.stop()
-    df = hist.copy()
+    df = hist.copy(deep=False)
 
     # Technical indicators
     if TOGGLE_VOL:
         df["ΔVolume%"] = df["Volume"].pct_change() * 100
-    for IND in INDICATORS:
-        if "SMA" in IND:
-            window = int(IND.split("_")[1])
-            df[IND] = df["Close"].rolling(window, min_periods=1).mean()
-        if "EMA" in IND:
-            window = int(IND.split("_")[1])
-            df[IND] = df["Close"].ewm(span=window, adjust=False, min_periods=1).mean()
-        if IND == "RSI":
-            delta = df["Close"].pct_change() * 100
-            gain = delta.where(delta > 0, 0).rolling(14, min_periods=1).mean()
-            loss = -delta.where(delta < 0, 0).rolling(14, min_periods=1).mean()
-            rs = gain / loss.replace(0, pd.NA)
-            df["RSI"] = 100 - (100 / (1 + rs))
-        if IND == "ATR":
-            prev_close = df["Close"].shift(1)
-            df["TR"] = pd.concat(
-                [(df["High"] - df["Low"]).abs(),
-                 (df["High"] - prev_close).abs(),
-                 (df["Low"] - prev_close).abs()], axis=1
-            ).max(axis=1)
-            df["ATR"] = df["TR"].rolling(14, min_periods=1).mean()
-        if IND == "MACD":
-            ema_short = df["Close"].ewm(span=12, adjust=False, min_periods=1).mean()
-            ema_long = df["Close"].ewm(span=26, adjust=False, min_periods=1).mean()
-            df["MACD"] = ema_short - ema_long
-            df["Signal"] = df["MACD"].ewm(span=9, adjust=False, min_periods=1).mean()
-            df["MACD_Hist"] = df["MACD"] - df["Signal"]
+    df = indicators_for((TICKER, PERIOD, INTERVAL), df, INDICATORS)
+
+    # Volume studies
+    ANCHOR = None
+    if "Anchored VWAP" in VOLUME_STUDIES:
+        ANCHOR = st.selectbox(
+            "Anchor VWAP at:", options=df.index,
+            format_func=lambda t: t.strftime("%Y-%m-%d %H:%M"),
+        )
+    df, PROFILE, LEVELS = add_volume_studies(df, hist, INTERVAL, VOLUME_STUDIES, anchor=ANCHOR)
 
     # Plot candlestick
-    fig = plot_candles_stick_bar(df, title=f"{NAME} ({TICKER})", currency=CURRENCY)
+    fig = plot_candles_stick_bar(
+        df, title=f"{NAME} ({TICKER})", currency=CURRENCY, profile=PROFILE, levels=LEVELS,
+    )
     st.plotly_chart(fig, use_container_width=True)
 
-    with st.expander("Show Data Table"):
-        st.dataframe(df.reset_index(), hide_index=False)
+    # Several intervals from one fetch, built only when switched on
+    if st.toggle("Multi-timeframe view", key="mtf_show"):
+        multi_timeframe_panel(TICKER)
+
+    paged_table(df, key="price_data", label="Show Data Table")
+    with st.expander("Export"):
+        export_panel(df, f"{TICKER}_{PERIOD}_{INTERVAL}", key="price_export")
+
+    # Backtest
+    with st.expander("Backtest SMA crossover"):
+        col1, col2 = st.columns(2)
+        FAST = col1.slider("Fast SMA range:", 10, 200, (10, 50))
+        SLOW = col2.slider("Slow SMA range:", 10, 200, (50, 200))
+        STEP = st.select_slider("Step:", options=[1, 2, 5, 10], value=5)
+        COST = st.number_input("Cost per trade (%):", 0.0, 1.0, 0.05, step=0.01) / 100
+        if st.button("Run backtest"):
+            close = hist["Close"].dropna()
+            stats = sweep_sma_crossover(
+                close.to_numpy(),
+                range(FAST[0], FAST[1] + 1, STEP),
+                range(SLOW[0], SLOW[1] + 1, STEP),
+                cost=COST,
+                interval=INTERVAL,
+            )
+            if stats.empty:
+                st.warning("No fast/slow pair with fast < slow in the selected ranges.")
+            else:
+                stats = stats.sort_values("Sharpe", ascending=False)
+                BEST_FAST, BEST_SLOW = stats.index[0]
+                st.write(f"Best by Sharpe: SMA {BEST_FAST}/{BEST_SLOW} ({len(stats)} pairs tested)")
+                st.line_chart(equity_curve(close, BEST_FAST, BEST_SLOW, cost=COST, index=close.index))
+                st.dataframe(stats.head(20).style.format("{:.2f}"))
 
 # ------------------------------------------------------
 # MULTIPLE STOCKS OR F&O TICKERS
@@ -283,13 +326,76 @@ if len(TICKERS) == 1:
 else:
     st.header("Comparative View")
 
-    dfs_hist, dfs_info = [], []
-    for T in TICKERS:
-        info = fetch_info(T)
-        if isinstance(info, Exception):
-            continue
-        df_i = info_table(info).rename(columns={0: T}).reset_index().rename(columns={"index": "Feature"})
-        dfs_info.append(df_i.set_index("Feature"))
-        hist = fetch_history(T, period=PERIOD, interval=INTERVAL)
+    # The chart needs only the histories; the info table fills in after it
+    pending_hists = {T: client.submit(fetch_history, T, period=PERIOD, interval=INTERVAL) for T in TICKERS}
+    pending_infos = {T: client.submit(fetch_info, T) for T in TICKERS}
+
+    dfs_hist = []
+    for T, pending in pending_hists.items():
+        hist = pending.result()
         if isinstance(hist, Exception):
             continue
+        df_h = hist.copy(deep=False)
+        df_h.insert(0, "Ticker", T)
+        dfs_hist.append(df_h)
+
+    if len(dfs_hist) == 0:
+        st.error("No data available for the selected tickers.")
+        st.stop()
+
+    df = pd.concat(dfs_hist)
+
+    fig = plot_line_multiple(df, "Percent Change Line Chart")
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("Company / Instrument Info"):
+        dfs_info = []
+        for T, pending in pending_infos.items():
+            info = pending.result()
+            if isinstance(info, Exception):
+                continue
+            df_i = info_table(info).rename(columns={0: T}).reset_index().rename(columns={"index": "Feature"})
+            dfs_info.append(df_i.set_index("Feature"))
+        if dfs_info:
+            st.dataframe(pd.concat(dfs_info, axis=1))
+
+    with st.expander("Export"):
+        export_panel(df, f"comparative_{PERIOD}_{INTERVAL}", key="comparative_export")
+        ARCHIVE_FNO = st.toggle("Archive the whole F&O list", value=False)
+        archive_panel(
+            fetch_fno_list() if ARCHIVE_FNO else TICKERS,
+            name="fno" if ARCHIVE_FNO else "watchlist",
+            key="archive_export",
+            period=PERIOD,
+            interval=INTERVAL,
+            indicators=INDICATORS,
+        )
+
+    # Correlation / beta vs NIFTY 50
+    st.subheader("🔗 Correlation & Beta")
+    FULL_UNIVERSE = st.toggle("Use the full F&O universe", value=False)
+    WINDOW = st.slider("Rolling window (bars):", 10, 120, 20)
+    universe = fetch_fno_list() if FULL_UNIVERSE else TICKERS
+    # a full-universe screen queues behind page renders for the upstream budget
+    with priority(BULK if FULL_UNIVERSE else INTERACTIVE):
+        stats = correlation_stats(tuple(universe), period=PERIOD, interval=INTERVAL, window=WINDOW)
+    if stats is None:
+        st.warning("Not enough overlapping data to compute correlations.")
+    else:
+        fig = plot_heatmap(stats["corr"], title=f"Correlation of returns ({PERIOD}, {INTERVAL})")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(stats["summary"].style.format("{:.2f}"))
+        st.line_chart(stats["rolling_beta"])
+        st.caption(f"Rolling {WINDOW}-bar correlation to NIFTY 50")
+        st.line_chart(stats["rolling_corr"])
+        ends = list(stats["rolling_matrices"])
+        END = st.select_slider(
+            "Correlation over the window ending:", options=ends, value=ends[-1],
+            format_func=lambda t: t.strftime("%Y-%m-%d %H:%M"),
+        )
+        st.plotly_chart(
+            plot_heatmap(stats["rolling_matrices"][END], title=f"Correlation over {WINDOW} bars to {END:%Y-%m-%d}"),
+            use_container_width=True,
+        )
+        if stats["excluded"]:
+            st.caption(f"Left out (no data or too short a history): {', '.join(stats['excluded'])}")
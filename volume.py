@@ -0,0 +1,133 @@
+# ==========================================================
+# volume.py — VWAP, anchored VWAP and volume-at-price profiles
+# ==========================================================
+#
+# Everything is cumulative sums and one bincount over the bar arrays:
+# session VWAP subtracts the running totals at each session start,
+# anchored VWAP those at the anchor bar, and the volume profile buckets
+# typical prices into equal-width bins weighted by volume.
+
+import numpy as np
+import pandas as pd
+
+STUDIES = ["VWAP", "Anchored VWAP", "Volume Profile"]
+
+INTRADAY = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"]
+
+PROFILE_BINS = 50
+VALUE_AREA = 0.70  # share of volume inside the value area
+
+
+def _arrays(df):
+    typical = ((df["High"] + df["Low"] + df["Close"]) / 3).to_numpy(dtype=float)
+    volume = np.nan_to_num(df["Volume"].to_numpy(dtype=float))
+    return typical, volume
+
+
+def session_starts(index, timezone=None):
+    """Position of the first bar of each bar's session (trading day).
+
+    Days are split at midnight in timezone, by default the index's own:
+    yfinance histories come in the exchange's timezone.
+    """
+    if timezone is not None and index.tz is not None:
+        index = index.tz_convert(timezone)
+    day = index.normalize().asi8
+    new = np.r_[True, day[1:] != day[:-1]]
+    return np.maximum.accumulate(np.where(new, np.arange(len(day)), 0))
+
+
+def _vwap_from(typical, volume, starts):
+    """VWAP accumulated from starts[i] to i, for every bar i."""
+    pv = np.r_[0.0, np.cumsum(typical * volume)]
+    v = np.r_[0.0, np.cumsum(volume)]
+    end = np.arange(1, len(typical) + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (pv[end] - pv[starts]) / (v[end] - v[starts])
+
+
+def session_vwap(df, timezone=None):
+    """VWAP that resets at every session start (intraday bars)."""
+    typical, volume = _arrays(df)
+    return pd.Series(_vwap_from(typical, volume, session_starts(df.index, timezone)), index=df.index, name="VWAP")
+
+
+def anchored_vwap(df, anchor):
+    """VWAP accumulated from the first bar at or after anchor; NaN before it."""
+    typical, volume = _arrays(df)
+    start = int(df.index.searchsorted(pd.Timestamp(anchor)))
+    out = np.full(len(df), np.nan)
+    if start < len(df):
+        out[start:] = _vwap_from(typical[start:], volume[start:], np.zeros(len(df) - start, dtype=int))
+    return pd.Series(out, index=df.index, name="AVWAP")
+
+
+def volume_profile(df, bins=PROFILE_BINS, value_area=VALUE_AREA):
+    """Volume at price over df.
+
+    Returns (profile, levels): profile is a DataFrame of bin centers
+    ("Price") and volumes; levels holds the point of control (POC) and
+    the value area high/low (VAH/VAL) around it.
+    """
+    typical, volume = _arrays(df)
+    keep = ~np.isnan(typical)
+    typical, volume = typical[keep], volume[keep]
+    if len(typical) == 0:
+        return pd.DataFrame(columns=["Price", "Volume"]), {}
+    low, high = typical.min(), typical.max()
+    width = (high - low) / bins or 1.0
+    bucket = np.minimum(((typical - low) / width).astype(int), bins - 1)
+    totals = np.bincount(bucket, weights=volume, minlength=bins)
+    centers = low + (np.arange(bins) + 0.5) * width
+
+    # value area: grow outwards from the POC, taking the larger neighbour
+    poc = int(totals.argmax())
+    lo = hi = poc
+    target, covered = value_area * totals.sum(), totals[poc]
+    while covered < target and (lo > 0 or hi < bins - 1):
+        below = totals[lo - 1] if lo > 0 else -1.0
+        above = totals[hi + 1] if hi < bins - 1 else -1.0
+        if above >= below:
+            hi += 1
+            covered += above
+        else:
+            lo -= 1
+            covered += below
+    levels = {"POC": float(centers[poc]), "VAH": float(centers[hi] + width / 2), "VAL": float(centers[lo] - width / 2)}
+    return pd.DataFrame({"Price": centers, "Volume": totals}), levels
+
+
+def volume_studies(hist, interval, anchor=None, bins=PROFILE_BINS):
+    """VWAP columns and volume profile of a history.
+
+    Returns (columns, profile, levels); columns holds VWAP (intraday
+    only) and AVWAP (when anchor is given) aligned to the history index.
+    Everything is vectorized, so the studies are recomputed from the
+    history the page holds instead of being cached apart from it.
+    """
+    columns = pd.DataFrame(index=hist.index)
+    if interval in INTRADAY:
+        columns["VWAP"] = session_vwap(hist)
+    if anchor is not None:
+        columns["AVWAP"] = anchored_vwap(hist, anchor)
+    profile, levels = volume_profile(hist, bins)
+    return columns, profile, levels
+
+
+def add_volume_studies(df, hist, interval, studies, anchor=None):
+    """Add the selected studies' columns to df for plot_candles_stick_bar.
+
+    hist is the OHLCV history df was built from. Returns (df, profile,
+    levels); profile and levels are None unless "Volume Profile" is
+    selected.
+    """
+    if not studies:
+        return df, None, None
+    columns, profile, levels = volume_studies(hist, interval, anchor if "Anchored VWAP" in studies else None)
+    if "VWAP" in studies and "VWAP" in columns:
+        df["VWAP"] = columns["VWAP"]
+    if "AVWAP" in columns:
+        df["AVWAP"] = columns["AVWAP"]
+    if "Volume Profile" not in studies:
+        return df, None, None
+    return df, profile, levels